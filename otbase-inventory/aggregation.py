@@ -0,0 +1,122 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import heapq
+import json
+
+# Default names of the dataflow record members. The API reference does not publish the dataflow
+# schema, so they are exposed as parameters of the Get Data Flow action for servers that differ.
+DEFAULT_GROUP_BY = ('srcDeviceId', 'dstDeviceId', 'protocol', 'port')
+DEFAULT_FLOW_FIELDS = {
+    'bytes_field': 'bytes',
+    'packets_field': 'packets',
+    'first_seen_field': 'first_seen',
+    'last_seen_field': 'last_seen'
+}
+DEFAULT_TOP_N = 10
+
+# Positions in a group accumulator list
+_FLOWS, _BYTES, _PACKETS, _FIRST_SEEN, _LAST_SEEN = range(5)
+
+
+def get_path(record, path):
+    value = record
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _group_value(value):
+    """A hashable group key member; lists and objects are grouped by their canonical JSON text."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return value
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class FlowAggregator(object):
+    """Group dataflow records by a set of keys, keeping only one small accumulator per group.
+
+    Memory grows with the number of distinct groups, not with the number of flows.
+    """
+
+    def __init__(self, group_by=DEFAULT_GROUP_BY, bytes_field=DEFAULT_FLOW_FIELDS['bytes_field'],
+                 packets_field=DEFAULT_FLOW_FIELDS['packets_field'],
+                 first_seen_field=DEFAULT_FLOW_FIELDS['first_seen_field'],
+                 last_seen_field=DEFAULT_FLOW_FIELDS['last_seen_field']):
+        self.group_by = tuple(group_by)
+        self.bytes_field = bytes_field
+        self.packets_field = packets_field
+        self.first_seen_field = first_seen_field
+        self.last_seen_field = last_seen_field
+        self.flows = 0
+        self._groups = {}
+        self._talkers = {}
+
+    def add(self, record):
+        self.flows += 1
+        key = tuple(_group_value(get_path(record, field)) for field in self.group_by)
+        size = _number(get_path(record, self.bytes_field))
+        packets = _number(get_path(record, self.packets_field))
+        first_seen = get_path(record, self.first_seen_field) or get_path(record, self.last_seen_field)
+        last_seen = get_path(record, self.last_seen_field) or first_seen
+        group = self._groups.get(key)
+        if group is None:
+            self._groups[key] = [1, size, packets, first_seen, last_seen]
+        else:
+            group[_FLOWS] += 1
+            group[_BYTES] += size
+            group[_PACKETS] += packets
+            if first_seen and (group[_FIRST_SEEN] is None or first_seen < group[_FIRST_SEEN]):
+                group[_FIRST_SEEN] = first_seen
+            if last_seen and (group[_LAST_SEEN] is None or last_seen > group[_LAST_SEEN]):
+                group[_LAST_SEEN] = last_seen
+        talker = self._talkers.get(key[0])
+        if talker is None:
+            self._talkers[key[0]] = [1, size]
+        else:
+            talker[0] += 1
+            talker[1] += size
+
+    def groups(self):
+        rows = sorted(self._groups.items(), key=lambda item: (item[1][_BYTES], item[1][_FLOWS]), reverse=True)
+        return [{
+            'key': dict(zip(self.group_by, key)),
+            'flows': group[_FLOWS],
+            'bytes': group[_BYTES],
+            'packets': group[_PACKETS],
+            'first_seen': group[_FIRST_SEEN],
+            'last_seen': group[_LAST_SEEN]
+        } for key, group in rows]
+
+    def top_talkers(self, top_n=DEFAULT_TOP_N):
+        """The first group_by key values with the most bytes (then flows)."""
+        top = heapq.nlargest(top_n, self._talkers.items(), key=lambda item: (item[1][1], item[1][0]))
+        return [{'talker': talker, 'flows': totals[0], 'bytes': totals[1]} for talker, totals in top]
+
+    def result(self, top_n=DEFAULT_TOP_N):
+        return {
+            'data': self.groups(),
+            'top_talkers': self.top_talkers(top_n),
+            'info': {'flows': self.flows, 'groups': len(self._groups), 'group_by': list(self.group_by),
+                     'fields': {'bytes': self.bytes_field, 'packets': self.packets_field,
+                                'first_seen': self.first_seen_field, 'last_seen': self.last_seen_field}}
+        }
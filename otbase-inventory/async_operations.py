@@ -0,0 +1,263 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from connectors.core.connector import ConnectorError, get_logger
+
+from .async_transport import (event_loop, fetch, RequestTiming, CONNECT_TIMEOUT_ERRORS, CONNECTION_ERRORS,
+                              READ_TIMEOUT_ERRORS, SSL_ERRORS)
+from .debug import debug_trace
+from .operations import (OTBase, headers, _bulk_delete_result, _bulk_details_request, _bulk_details_result,
+                         _delete_status, _device_data, _next_offset, _shard_ids, _shard_model, _shard_outcome,
+                         _shard_payload, _shard_request, _sharded_result, _count_payload, _to_list, _total_devices,
+                         _REQUEST_AGAIN, DEFAULT_CONCURRENCY, DEFAULT_MAX_RECORDS, PREFETCH_PAGES)
+from .projection import project
+
+logger = get_logger("otbase-inventory")
+
+# aiohttp announces the content codings it can decode itself, which may differ from those of urllib3
+async_headers = {key: value for key, value in headers.items() if key != 'Accept-Encoding'}
+
+
+class AsyncOTBase(OTBase):
+    """OTBase sending its requests with aiohttp on the worker's event loop.
+
+    Response caching and revalidation, debug tracing, retries, the server governor and metrics are
+    those of OTBase; responses are always read in full.
+    """
+
+    async def make_rest_call(self, endpoint, method, data=None, params=None):
+        try:
+            url, cache_key, cache_ttl, validators, cached = self._prepare(endpoint, method, data, params)
+            if cached is not None:
+                return cached
+            session = event_loop.sessions.get(self.config)
+            try:
+                response = await self._send_async(session, method, url, data=data, params=params,
+                                                  extra_headers=validators)
+            except Exception as err:
+                if self.debug.record:
+                    debug_trace.record(method, url, params, data, error=err)
+                raise
+            if self.debug.record:
+                debug_trace.record(method, url, params, data, response)
+            result = self._result(endpoint, method, url, response, False, cache_key, cache_ttl, validators)
+            if result is _REQUEST_AGAIN:
+                return await self.make_rest_call(endpoint, method, data=data, params=params)
+            return result
+        except SSL_ERRORS:
+            logger.error('SSL certificate validation failed')
+            raise ConnectorError('SSL certificate validation failed')
+        except CONNECT_TIMEOUT_ERRORS:
+            logger.error('The request timed out while trying to connect to the server')
+            raise ConnectorError('The request timed out while trying to connect to the server')
+        except READ_TIMEOUT_ERRORS:
+            logger.error('The server did not send any data in the allotted amount of time')
+            raise ConnectorError('The server did not send any data in the allotted amount of time')
+        except CONNECTION_ERRORS:
+            logger.error('Invalid endpoint or credentials')
+            raise ConnectorError('Invalid endpoint or credentials')
+        except Exception as err:
+            logger.error(str(err))
+            raise ConnectorError(str(err))
+
+    async def _send_async(self, session, method, url, data=None, params=None, extra_headers=None):
+        request_headers = dict(async_headers, **extra_headers) if extra_headers else async_headers
+        attempts = self.retry_policy.attempts(method)
+        attempt = 0
+        response = None
+        sent = None
+        timing = RequestTiming()
+        try:
+            while True:
+                attempt += 1
+                response = None
+                try:
+                    async with self.governor.acquire_async():
+                        # Latencies exclude the time spent waiting on the rate limit
+                        sent = time.monotonic()
+                        response = await fetch(session, method, url, timing, data=data, params=params,
+                                               headers=request_headers)
+                except SSL_ERRORS:
+                    raise
+                except CONNECTION_ERRORS as err:
+                    if attempt >= attempts:
+                        raise
+                    delay = self.retry_policy.delay(attempt)
+                    logger.warning('Attempt {0} for {1} failed ({2}), retrying in {3:.1f}s'.format(
+                        attempt, url, err.__class__.__name__, delay))
+                    await asyncio.sleep(delay)
+                    continue
+                if attempt < attempts and self.retry_policy.should_retry(response):
+                    delay = self.retry_policy.delay(attempt, response)
+                    logger.warning('Attempt {0} for {1} returned {2}, retrying in {3:.1f}s'.format(
+                        attempt, url, response.status_code, delay))
+                    await asyncio.sleep(delay)
+                    continue
+                return response
+        finally:
+            self._record(method, url, response, sent, attempt - 1, False, connect=timing.connect)
+
+
+async def _gather(func, items, concurrency=None):
+    """Await func over items, ``concurrency`` at a time; returns (item, result, error) tuples in input order.
+
+    Unlike the thread fan-out, this is not capped by the connection pool: a waiting coroutine holds
+    neither a thread nor a connection, and the governor caps the requests actually sent.
+    """
+    semaphore = asyncio.Semaphore(max(1, int(concurrency or DEFAULT_CONCURRENCY)))
+
+    async def run(item):
+        async with semaphore:
+            try:
+                return item, await func(item), None
+            except Exception as err:
+                return item, None, err
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
+
+
+async def iter_pages(lan, endpoint, payload, prefetch=0):
+    """Awaitable operations.iter_pages: the pages of a list endpoint, ``prefetch`` of them requested ahead."""
+    payload = dict(payload)
+    offset = int(payload.get('offset') or 0)
+    while True:
+        response = await lan.make_rest_call(endpoint, 'GET', params=dict(payload, offset=offset))
+        if not isinstance(response, dict):
+            return
+        yield response
+        next_offset = _next_offset(offset, len(response.get('data') or []), response.get('info') or {})
+        if next_offset is None:
+            return
+        total = (response.get('info') or {}).get('total')
+        if prefetch and total is not None and total != '':
+            stride = next_offset - offset
+            pages = _iter_prefetched_pages(lan, endpoint, payload, range(next_offset, int(total), stride), prefetch)
+            try:
+                async for page in pages:
+                    yield page
+            finally:
+                await pages.aclose()
+            return
+        offset = next_offset
+
+
+async def _iter_prefetched_pages(lan, endpoint, payload, offsets, prefetch):
+    offsets = iter(offsets)
+    pending = deque()
+
+    def submit_next():
+        offset = next(offsets, None)
+        if offset is not None:
+            page_payload = dict(payload, offset=offset)
+            pending.append(asyncio.ensure_future(lan.make_rest_call(endpoint, 'GET', params=page_payload)))
+
+    try:
+        for _ in range(prefetch):
+            submit_next()
+        while pending:
+            response = await pending.popleft()
+            submit_next()
+            if not isinstance(response, dict) or not response.get('data'):
+                return
+            yield response
+    finally:
+        for task in pending:
+            task.cancel()
+            if task.done() and not task.cancelled():
+                # Retrieve the error of a page nobody awaits, so that asyncio does not log it
+                task.exception()
+
+
+async def _enumerate_shards(lan, shard_by):
+    networks = []
+    pages = iter_pages(lan, 'networks', {}, prefetch=PREFETCH_PAGES)
+    try:
+        async for page in pages:
+            networks.extend(page.get('data') or [])
+            if len(networks) >= DEFAULT_MAX_RECORDS:
+                del networks[DEFAULT_MAX_RECORDS:]
+                break
+    finally:
+        await pages.aclose()
+    return _shard_ids(networks, shard_by)
+
+
+async def _fetch_shard(lan, shard_by, shard_id, payload, fields, max_records, model):
+    started = time.monotonic()
+    devices = []
+    truncated = False
+    pages = iter_pages(lan, 'devices', _shard_payload(payload, shard_by, shard_id), prefetch=PREFETCH_PAGES)
+    try:
+        async for page in pages:
+            for device in page.get('data') or []:
+                if len(devices) >= max_records:
+                    truncated = True
+                    break
+                devices.append(model(project(device, fields)))
+            if truncated:
+                break
+    finally:
+        await pages.aclose()
+    return _shard_outcome(shard_by, shard_id, devices, started, truncated)
+
+
+async def _fetch_device(lan, device_id, payload, fields):
+    response = await lan.make_rest_call('devices/{0}'.format(device_id), 'GET', params=payload)
+    return _device_data(device_id, response, fields)
+
+
+async def _delete_device(lan, device_id, dry_run=False):
+    response = await lan.make_rest_call('devices/{0}'.format(device_id), 'GET' if dry_run else 'DELETE')
+    return _delete_status(response, dry_run)
+
+
+async def get_devices_details_bulk(config, params):
+    lan = AsyncOTBase(config)
+    device_ids, payload, fields = _bulk_details_request(params)
+    outcomes = await _gather(lambda device_id: _fetch_device(lan, device_id, payload, fields), device_ids,
+                             params.get('concurrency'))
+    return _bulk_details_result(device_ids, outcomes)
+
+
+async def delete_devices_bulk(config, params):
+    lan = AsyncOTBase(config)
+    device_ids = _to_list(params.get('device_ids'))
+    dry_run = params.get('dry_run', False)
+    outcomes = await _gather(lambda device_id: _delete_device(lan, device_id, dry_run), device_ids,
+                             params.get('concurrency'))
+    return _bulk_delete_result(device_ids, outcomes, dry_run)
+
+
+async def get_devices_sharded(config, params):
+    started = time.monotonic()
+    lan = AsyncOTBase(config)
+    shard_by, shard_ids, payload, fields = _shard_request(params)
+    expected = None
+    if not shard_ids:
+        shard_ids, expected = await asyncio.gather(
+            _enumerate_shards(lan, shard_by),
+            lan.make_rest_call('devices', 'GET', params=_count_payload(payload)))
+        expected = _total_devices(expected)
+    max_records = int(params.get('max_records') or DEFAULT_MAX_RECORDS)
+    model = _shard_model(fields)
+    outcomes = await _gather(
+        lambda shard_id: _fetch_shard(lan, shard_by, shard_id, payload, fields, max_records, model),
+        shard_ids, params.get('concurrency'))
+    return _sharded_result(shard_by, outcomes, params.get('map_to_assets', False), started, expected)
+
+
+# The operations that fan out to many requests; the others send one request, or walk pages one
+# after the other, and run synchronously on the calling thread
+async_operations = {
+    'get_devices_details_bulk': get_devices_details_bulk,
+    'delete_devices_bulk': delete_devices_bulk,
+    'get_devices_sharded': get_devices_sharded
+}
@@ -0,0 +1,211 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import asyncio
+import os
+import ssl
+import threading
+import time
+from datetime import timedelta
+
+from connectors.core.connector import get_logger
+
+from .transport import (connection_pool_size, pkcs12_cache, request_timeout, SessionPool, SESSION_IDLE_TIMEOUT,
+                        SESSION_POOL_MAX_SIZE)
+
+try:
+    import aiohttp
+    from multidict import CIMultiDict
+except ImportError:
+    aiohttp = None
+    SSL_ERRORS = CONNECT_TIMEOUT_ERRORS = READ_TIMEOUT_ERRORS = CONNECTION_ERRORS = ()
+else:
+    # Mirror the requests exceptions that OTBase.make_rest_call reports; aiohttp older than 3.10
+    # does not tell connect and read timeouts apart
+    SSL_ERRORS = (aiohttp.ClientSSLError,)
+    CONNECT_TIMEOUT_ERRORS = (getattr(aiohttp, 'ConnectionTimeoutError', aiohttp.ServerTimeoutError),)
+    READ_TIMEOUT_ERRORS = (aiohttp.ServerTimeoutError, asyncio.TimeoutError)
+    CONNECTION_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+logger = get_logger("otbase-inventory")
+
+
+def async_available():
+    """Whether the asyncio transport can be used, that is whether aiohttp is installed."""
+    return aiohttp is not None
+
+
+class AsyncResponse(object):
+    """A fully read aiohttp response, with the attributes of a ``requests.Response`` that the connector uses."""
+
+    def __init__(self, status_code, headers, content, elapsed):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        # Time to the response headers, like requests.Response.elapsed
+        self.elapsed = elapsed
+        # aiohttp hands over decoded bodies; the size as received is only known from the Content-Length
+        length = headers.get('Content-Length')
+        self.received = int(length) if length and length.isdigit() else None
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def close(self):
+        pass
+
+
+class RequestTiming(object):
+    """Time spent establishing connections (TCP and TLS handshake) for one request, filled in by the trace hooks."""
+
+    def __init__(self):
+        self.connect = 0.0
+        self._started = None
+
+
+async def _on_connection_create_start(session, context, params):
+    context.trace_request_ctx._started = time.monotonic()
+
+
+async def _on_connection_create_end(session, context, params):
+    timing = context.trace_request_ctx
+    if timing._started is not None:
+        timing.connect += time.monotonic() - timing._started
+        timing._started = None
+
+
+def _ssl_context(config):
+    """The ssl argument of aiohttp for a configuration: the pooled client certificate context, or the verify flag."""
+    verify_ssl = bool(config.get('verify_ssl'))
+    if config.get('pfx_path'):
+        ssl_context = pkcs12_cache.get(config.get('pfx_path'), config.get('pfx_password'), verify_ssl)
+        if not verify_ssl:
+            # The context of the unverified variant is not shared with verified configurations
+            ssl_context.verify_mode = ssl.CERT_NONE
+        return ssl_context
+    return None if verify_ssl else False
+
+
+def _build_client_session(config):
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    connect_timeout, read_timeout = request_timeout(config)
+    # The same number of keep-alive connections as the requests sessions; the governor caps the
+    # requests in flight, so no coroutine holds a connection while waiting for a slot
+    connector = aiohttp.TCPConnector(limit=connection_pool_size(config), ssl=_ssl_context(config))
+    return aiohttp.ClientSession(
+        connector=connector,
+        auth=aiohttp.BasicAuth(config.get('username') or '', config.get('password') or ''),
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout),
+        trace_configs=[trace_config])
+
+
+class AsyncSessionPool(SessionPool):
+    """Keep-alive ``aiohttp.ClientSession`` objects of the worker's event loop, pooled like the requests sessions.
+
+    Sessions are built on the event loop; configurations updated or deleted from another thread have
+    their sessions closed on it.
+    """
+
+    def __init__(self, loop, max_size=SESSION_POOL_MAX_SIZE, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.loop = loop
+        super(AsyncSessionPool, self).__init__(max_size=max_size, idle_timeout=idle_timeout)
+
+    def _build(self, config):
+        return _build_client_session(config)
+
+    def _close_session(self, session):
+        self.loop.call_soon_threadsafe(lambda: self.loop.create_task(session.close()))
+
+
+class EventLoopThread(object):
+    """The single asyncio event loop of a worker, running in a daemon thread.
+
+    Synchronous callers submit coroutines with :meth:`run` and block until they complete; the
+    coroutines run in the context of the caller, so their requests are attributed to its operation.
+    The loop is started lazily and restarted in forked processes, whose copy of the thread is not running.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._sessions = None
+        self._pid = None
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        threading.Thread(target=run, name='otbase-event-loop', daemon=True).start()
+        ready.wait()
+        return loop
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = self._start()
+                # The sessions of a parent process belong to its loop and are dropped with it
+                self._sessions = AsyncSessionPool(self._loop)
+                self._pid = os.getpid()
+            return self._loop, self._sessions
+
+    @property
+    def sessions(self):
+        return self._ensure_started()[1]
+
+    def run(self, coro):
+        loop = self._ensure_started()[0]
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def invalidate(self, config):
+        """Close the pooled session of a configuration that was updated or deleted."""
+        with self._lock:
+            sessions = self._sessions if self._pid == os.getpid() else None
+        if sessions is not None:
+            sessions.invalidate(config)
+
+
+event_loop = EventLoopThread()
+
+
+def run_async(coro):
+    return event_loop.run(coro)
+
+
+def query_params(params):
+    """Query parameters as aiohttp accepts them: lists repeat their key, booleans are sent as requests sends them."""
+    if not params:
+        return None
+    query = []
+    for key, value in params.items():
+        for item in (value if isinstance(value, (list, tuple)) else [value]):
+            if item is None:
+                continue
+            query.append((key, item if isinstance(item, (str, int, float)) and not isinstance(item, bool)
+                          else str(item)))
+    return query
+
+
+async def fetch(session, method, url, timing, data=None, params=None, headers=None):
+    """Send a request and read its body; aiohttp decodes the content codings it announced."""
+    started = time.monotonic()
+    async with session.request(method, url, data=data, params=query_params(params), headers=headers,
+                               trace_request_ctx=timing) as response:
+        elapsed = timedelta(seconds=time.monotonic() - started)
+        content = await response.read()
+        return AsyncResponse(response.status, CIMultiDict(response.headers), content, elapsed)
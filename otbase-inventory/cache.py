@@ -0,0 +1,161 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+RESPONSE_CACHE_MAX_SIZE = 1024
+VALIDATOR_STORE_MAX_SIZE = 1024
+
+# Seconds a GET response stays fresh, by endpoint prefix. List endpoints are not cached.
+RESPONSE_CACHE_TTL = {
+    'vulnerabilities/': 24 * 60 * 60,
+    'networks/': 10 * 60,
+    'devices/': 60
+}
+
+
+def _normalize_params(params):
+    if not params:
+        return ''
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class ResponseCache(object):
+    """TTL and size bounded LRU cache of read-only OTbase responses, shared by a worker."""
+
+    def __init__(self, max_size=RESPONSE_CACHE_MAX_SIZE, ttl=None):
+        self.max_size = max_size
+        self.ttl = RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def ttl_for(self, endpoint):
+        for prefix, ttl in self.ttl.items():
+            if endpoint.startswith(prefix):
+                return ttl
+        return None
+
+    @staticmethod
+    def make_key(base_url, username, endpoint, params=None):
+        return base_url, username, endpoint, _normalize_params(params)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[0])
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(value), time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, base_url, endpoint):
+        """Drop every cached response of an endpoint, whatever parameters it was requested with."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == base_url and k[2] == endpoint]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(float(self.hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+class ValidatorStore(object):
+    """Size bounded LRU of the ``ETag`` / ``Last-Modified`` validators of cached responses and their bodies.
+
+    Once a response cache entry expires, the request is sent with ``If-None-Match`` /
+    ``If-Modified-Since`` and a 304 answer is served from the body stored here.
+    """
+
+    def __init__(self, max_size=VALIDATOR_STORE_MAX_SIZE):
+        self.max_size = max_size
+        self.not_modified = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def conditional_headers(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        etag, last_modified = entry[:2]
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def store(self, key, response_headers, body, size=0):
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        with self._lock:
+            if not etag and not last_modified:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = (etag, last_modified, copy.deepcopy(body), size)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def revalidated(self, key):
+        """The stored body of a request answered with a 304, or None if its entry has been evicted since."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.not_modified += 1
+            self.bytes_saved += entry[3]
+            return copy.deepcopy(entry[2])
+
+    def invalidate(self, base_url, endpoint):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == base_url and k[2] == endpoint]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.not_modified = 0
+            self.bytes_saved = 0
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'not_modified': self.not_modified, 'bytes_saved': self.bytes_saved}
+
+
+response_cache = ResponseCache()
+validator_store = ValidatorStore()
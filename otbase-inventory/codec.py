@@ -0,0 +1,44 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import json
+
+# orjson decodes and encodes several times faster than the standard library; it is optional, the
+# connector falls back to the json module when it is not installed on the worker
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_CODEC = 'json' if orjson is None else 'orjson'
+
+
+def loads(data):
+    """Decode a JSON document from bytes or str."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN, Infinity and other extensions that only the json module accepts
+            pass
+    return json.loads(data)
+
+
+def dumpb(value):
+    """Encode a value as compact UTF-8 JSON bytes; both codecs produce the same document."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # Values orjson cannot encode, such as integers over 64 bits
+            pass
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps(value):
+    """Encode a value as compact JSON text."""
+    return dumpb(value).decode('utf-8')
@@ -7,7 +7,13 @@ Copyright end
 
 from connectors.core.connector import Connector, get_logger, ConnectorError
 
+from .async_operations import async_operations
+from .async_transport import async_available, event_loop, run_async
+from .inventory_index import inventory_indexes
+from .metrics import metrics
 from .operations import operations, _check_health
+from .sync_store import store_name
+from .transport import governors, session_pool
 
 logger = get_logger("otbase-inventory")
 
@@ -16,12 +22,30 @@ class OTBaseInventory(Connector):
     def execute(self, config, operation, params, **kwargs):
         logger.debug("Invoking {0} Operation".format(operation))
         try:
+            # The operations that fan out run as coroutines on the worker's event loop when aiohttp is
+            # installed, the others (and all of them without aiohttp) on the calling thread
+            coroutine = async_operations.get(operation) if async_available() else None
             action = operations.get(operation)
             logger.info('Executing action {0}'.format)
-            return action(config, params)
+            with metrics.track_operation(operation):
+                if coroutine is not None:
+                    return run_async(coroutine(config, params))
+                return action(config, params)
         except Exception as Err:
             logger.exception("Exception in execute function: {0} ".format(str(Err)))
             raise ConnectorError(str(Err))
 
     def check_health(self, config):
-        _check_health(config)
\ No newline at end of file
+        _check_health(config)
+
+    def on_update_config(self, old_config, new_config, active):
+        session_pool.invalidate(old_config)
+        event_loop.invalidate(old_config)
+        governors.forget(old_config)
+        inventory_indexes.invalidate(store_name(old_config))
+
+    def on_delete_config(self, config):
+        session_pool.invalidate(config)
+        event_loop.invalidate(config)
+        governors.forget(config)
+        inventory_indexes.invalidate(store_name(config))
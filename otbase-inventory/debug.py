@@ -0,0 +1,111 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import json
+import re
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from connectors.core.connector import get_logger
+
+logger = get_logger("otbase-inventory")
+
+# The curl script helper ships only with FortiSOAR builds that include the debug utilities; it is
+# resolved once here rather than on every request
+try:
+    from connectors.debug_utils.curl_script import make_curl
+except ImportError:
+    make_curl = None
+
+# Number of request/response pairs kept by the debug trace of a worker
+DEBUG_TRACE_SIZE = 100
+# Response bodies are truncated to this many characters in the debug trace, after they are masked
+DEBUG_BODY_LIMIT = 4096
+MASK = '***'
+_SECRET_NAMES = re.compile(r'pass|secret|token|key|auth|cookie', re.IGNORECASE)
+
+
+def sanitize(value):
+    """Mask the values of secret looking members of a dict (recursively) or of a JSON object string."""
+    if isinstance(value, dict):
+        return {k: MASK if _SECRET_NAMES.search(str(k)) else sanitize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize(item) for item in value]
+    if isinstance(value, (str, bytes)) and value[:1] in ('{', b'{'):
+        try:
+            return json.dumps(sanitize(json.loads(value)))
+        except ValueError:
+            return value
+    return value
+
+
+def sanitize_body(text, limit=DEBUG_BODY_LIMIT):
+    """Mask a whole JSON response body, then truncate it; a body that is not JSON is not recorded."""
+    if not text:
+        return text
+    try:
+        masked = json.dumps(sanitize(json.loads(text)))
+    except ValueError:
+        # Truncating first, or keeping the raw text, could leak the secrets of a document that does not parse
+        return '<{0} characters of non-JSON content not recorded>'.format(len(text))
+    return masked[:limit]
+
+
+class DebugTrace(object):
+    """Ring buffer of sanitized request/response pairs, for replaying the traffic of a debug session."""
+
+    def __init__(self, size=DEBUG_TRACE_SIZE):
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=size)
+
+    def record(self, method, url, params=None, data=None, response=None, error=None, stream=False):
+        entry = {
+            'time': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            'request': {'method': method, 'url': url, 'params': sanitize(params), 'body': sanitize(data)},
+            'response': None,
+            'error': str(error) if error is not None else None
+        }
+        if response is not None:
+            elapsed = getattr(response, 'elapsed', None)
+            entry['response'] = {
+                'status': response.status_code,
+                'headers': sanitize(dict(response.headers)),
+                # Streamed bodies are consumed by the caller and are not captured
+                'body': None if stream else sanitize_body(response.text),
+                'elapsed': elapsed.total_seconds() if elapsed is not None else None
+            }
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self, clear=False):
+        with self._lock:
+            entries = list(self._entries)
+            if clear:
+                self._entries.clear()
+            return entries
+
+
+class DebugMode(object):
+    """Per configuration debug settings; a disabled instance costs a single attribute check per request."""
+
+    def __init__(self, config):
+        self.enabled = bool(config.get('debug_mode'))
+        self.record = self.enabled and bool(config.get('record_requests'))
+
+    def request(self, method, url, headers=None, params=None, data=None, verify_ssl=None):
+        """Log the request as a curl command, or as a plain debug line when the helper is not available."""
+        if make_curl is None:
+            logger.debug('{0} {1} params={2}'.format(method, url, sanitize(params)))
+            return
+        try:
+            make_curl(method, url, headers=headers, params=params, data=data, verify_ssl=verify_ssl)
+        except Exception as err:
+            logger.debug('Unable to build the curl command: {0}'.format(err))
+
+
+debug_trace = DebugTrace()
@@ -0,0 +1,149 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+from .codec import dumpb, loads
+
+# Top level device members kept in slots; the ones in INTERNED_FIELDS repeat across devices
+SCALAR_FIELDS = ('deviceId', 'name', 'description', 'zone', 'stage', 'criticality', 'safety', 'exposure', 'release',
+                 'warranty', 'os_firmware', 'modified', 'last_seen', 'last_seen_by', 'serialNumber', 'deviceRef',
+                 'hostedOn', 'documentation', 'last_patch_date', 'manufactureDate', 'installationDate',
+                 'days_since_last_patch')
+INTERNED_FIELDS = frozenset(('zone', 'stage', 'criticality', 'safety', 'exposure', 'release', 'warranty', 'os_firmware',
+                             'last_seen_by', 'hostedOn'))
+HARDWARE_FIELDS = ('type', 'vendor', 'model', 'version', 'description', 'orderNumber', 'vendorLink', 'lifecycle',
+                   'endOfLife')
+CONTEXT_FIELDS = ('location', 'locationId', 'otSystem', 'otSystemId', 'deviceGroup', 'referenceLocation',
+                  'referenceLocationId')
+CONNECTION_FIELDS = ('L3Address', 'L2Address', 'networkId')
+# Sub-object members unique to a device, which would only grow the interning table
+UNIQUE_FIELDS = frozenset(('orderNumber', 'L3Address', 'L2Address'))
+# Include groups that are rarely read; they are kept serialized until they are accessed
+LAZY_FIELDS = ('software', 'vulnerabilities', 'compliance', 'modules', 'admins')
+
+_KNOWN_FIELDS = frozenset(SCALAR_FIELDS + ('tags', 'hardware', 'context', 'connections') + LAZY_FIELDS)
+_MISSING = object()
+
+
+class Interner(object):
+    """Share one instance of each repeated string (vendor, model, zone, location...) between devices.
+
+    Unlike ``sys.intern``, the table is released together with the devices that use it.
+    """
+
+    def __init__(self):
+        self._table = {}
+
+    def __call__(self, value):
+        if isinstance(value, (str, tuple)):
+            return self._table.setdefault(value, value)
+        if isinstance(value, list):
+            return [self(item) for item in value]
+        if isinstance(value, dict):
+            return {self(k): self(v) for k, v in value.items()}
+        return value
+
+    def __len__(self):
+        return len(self._table)
+
+
+def _pack(mapping, fields, intern):
+    """A record of a dict: the values of its known members, a dict of any other members and its key order."""
+    if not isinstance(mapping, dict):
+        return mapping
+    values = tuple(mapping.get(field, _MISSING) if field in UNIQUE_FIELDS else intern(mapping.get(field, _MISSING))
+                   for field in fields)
+    extra = {intern(k): intern(v) for k, v in mapping.items() if k not in fields} or None
+    return values, extra, intern(tuple(mapping))
+
+
+def _unpack(record, fields):
+    if not isinstance(record, tuple):
+        return record
+    values, extra, order = record
+    known = dict(zip(fields, values))
+    if extra:
+        known.update(extra)
+    return {key: known[key] for key in order}
+
+
+class CompactDevice(object):
+    """A device held in slots, with shared strings and packed sub-objects, instead of a dict of dicts.
+
+    :meth:`get` reads a member the way ``dict.get`` would, materializing sub-objects on demand;
+    :meth:`to_dict` rebuilds the complete device at the output boundary.
+    """
+
+    __slots__ = SCALAR_FIELDS + ('tags', 'hardware', 'context', 'connections', '_lazy', '_extra', '_order')
+
+    def __init__(self, device, intern=None):
+        intern = Interner() if intern is None else intern
+        for field in SCALAR_FIELDS:
+            value = device.get(field, _MISSING)
+            setattr(self, field, intern(value) if field in INTERNED_FIELDS else value)
+        tags = device.get('tags', _MISSING)
+        self.tags = tuple(intern(tag) for tag in tags) if isinstance(tags, list) else tags
+        self.hardware = _pack(device['hardware'], HARDWARE_FIELDS, intern) if 'hardware' in device else _MISSING
+        self.context = _pack(device['context'], CONTEXT_FIELDS, intern) if 'context' in device else _MISSING
+        connections = device.get('connections', _MISSING)
+        if isinstance(connections, list):
+            connections = tuple(_pack(connection, CONNECTION_FIELDS, intern) for connection in connections)
+        self.connections = connections
+        lazy = {field: dumpb(device[field]) for field in LAZY_FIELDS if field in device}
+        self._lazy = lazy or None
+        self._extra = {k: intern(v) for k, v in device.items() if k not in _KNOWN_FIELDS} or None
+        # Devices of one listing share their key order, so a single tuple serves all of them
+        self._order = intern(tuple(device))
+
+    def get(self, key, default=None):
+        if key in SCALAR_FIELDS:
+            value = getattr(self, key)
+        elif key == 'tags':
+            value = list(self.tags) if isinstance(self.tags, tuple) else self.tags
+        elif key == 'hardware':
+            value = _unpack(self.hardware, HARDWARE_FIELDS)
+        elif key == 'context':
+            value = _unpack(self.context, CONTEXT_FIELDS)
+        elif key == 'connections':
+            connections = self.connections
+            value = [_unpack(c, CONNECTION_FIELDS) for c in connections] if isinstance(connections, tuple) \
+                else connections
+        elif key in LAZY_FIELDS:
+            value = loads(self._lazy[key]) if self._lazy and key in self._lazy else _MISSING
+        else:
+            value = self._extra.get(key, _MISSING) if self._extra else _MISSING
+        return default if value is _MISSING else value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def to_dict(self):
+        """The device as it was received, members in their original order."""
+        return {key: self.get(key) for key in self._order}
+
+
+def compact_devices(after=0):
+    """A function turning device dicts into :class:`CompactDevice` records that share one :class:`Interner`.
+
+    The first ``after`` devices are returned unchanged, so small listings do not pay for the conversion.
+    """
+    intern = Interner()
+    seen = [0]
+
+    def compact(device):
+        seen[0] += 1
+        if seen[0] <= after or not isinstance(device, dict):
+            return device
+        return CompactDevice(device, intern)
+    return compact
+
+
+def to_dicts(records):
+    """Convert the compact records of a list back to dicts in place, one record at a time."""
+    for position, record in enumerate(records):
+        if isinstance(record, CompactDevice):
+            records[position] = record.to_dict()
+    return records
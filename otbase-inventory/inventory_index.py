@@ -0,0 +1,151 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import ipaddress
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from .device_model import Interner
+
+DEFAULT_REFRESH_INTERVAL = 3600
+
+_MAC_SEPARATORS = re.compile(r'[^0-9a-f]')
+
+
+def normalize_mac(value):
+    digits = _MAC_SEPARATORS.sub('', str(value).lower())
+    if len(digits) != 12:
+        return None
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def parse_ip(value):
+    try:
+        return ipaddress.ip_interface(str(value).strip()).ip
+    except ValueError:
+        return None
+
+
+def device_summary(device, intern=None):
+    """The identifying members of a device; ``intern`` shares the strings that repeat across devices."""
+    if intern is None:
+        intern = Interner()
+    hardware = device.get('hardware') or {}
+    context = device.get('context') or {}
+    connections = device.get('connections') or []
+    return {
+        'deviceId': device.get('deviceId'),
+        'name': device.get('name'),
+        'zone': intern(device.get('zone')),
+        'location': intern(context.get('location')),
+        'type': intern(hardware.get('type')),
+        'vendor': intern(hardware.get('vendor')),
+        'model': intern(hardware.get('model')),
+        'ipAddresses': [c.get('L3Address') for c in connections if c.get('L3Address')],
+        'macAddresses': [c.get('L2Address') for c in connections if c.get('L2Address')],
+        'networks': [intern(c.get('networkId')) for c in connections if c.get('networkId')]
+    }
+
+
+class InventoryIndex(object):
+    """In-memory lookup structures over the device inventory.
+
+    Exact IP and MAC lookups are hash maps. CIDR lookups bisect a sorted array of integer
+    addresses per IP version, so a subnet query costs O(log n + matches). The device IDs of a key
+    are kept in insertion-ordered dicts, so adding and deduplicating them is linear too.
+    """
+
+    def __init__(self, devices=()):
+        self.devices = {}
+        self.by_ip = {}
+        self.by_mac = {}
+        self.by_network = {}
+        self._sorted = {4: ([], []), 6: ([], [])}
+        self.built_at = time.time()
+        pairs = {4: [], 6: []}
+        intern = Interner()
+        for device in devices:
+            summary = device_summary(device, intern)
+            device_id = summary['deviceId']
+            self.devices[device_id] = summary
+            for address in summary['ipAddresses']:
+                ip = parse_ip(address)
+                if ip is not None:
+                    self._add(self.by_ip, str(ip), device_id)
+                    pairs[ip.version].append((int(ip), device_id))
+            for address in summary['macAddresses']:
+                mac = normalize_mac(address)
+                if mac is not None:
+                    self._add(self.by_mac, mac, device_id)
+            for network_id in summary['networks']:
+                self._add(self.by_network, str(network_id), device_id)
+        for version, items in pairs.items():
+            items.sort()
+            self._sorted[version] = ([key for key, _ in items], [device_id for _, device_id in items])
+
+    @staticmethod
+    def _add(mapping, key, device_id):
+        mapping.setdefault(key, {})[device_id] = None
+
+    def _summaries(self, device_ids):
+        return [self.devices[device_id] for device_id in device_ids]
+
+    def lookup_ip(self, value):
+        ip = parse_ip(value)
+        return self._summaries(self.by_ip.get(str(ip), [])) if ip is not None else []
+
+    def lookup_mac(self, value):
+        mac = normalize_mac(value)
+        return self._summaries(self.by_mac.get(mac, [])) if mac is not None else []
+
+    def lookup_network(self, value):
+        return self._summaries(self.by_network.get(str(value).strip(), []))
+
+    def lookup_cidr(self, value):
+        try:
+            network = ipaddress.ip_network(str(value).strip(), strict=False)
+        except ValueError:
+            return []
+        keys, device_ids = self._sorted[network.version]
+        start = bisect_left(keys, int(network.network_address))
+        end = bisect_right(keys, int(network.broadcast_address))
+        # A device with several addresses in the subnet is returned once, at its lowest address
+        return self._summaries(dict.fromkeys(device_ids[start:end]))
+
+
+class IndexRegistry(object):
+    """Inventory indexes of a worker, one per configuration, rebuilt when they get older than requested."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._build_locks = {}
+
+    def get(self, key, build, max_age=DEFAULT_REFRESH_INTERVAL, force_refresh=False):
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        # One build per key at a time; concurrent callers wait and reuse the fresh index
+        with build_lock:
+            index = self._indexes.get(key)
+            if force_refresh or index is None or time.time() - index.built_at > max_age:
+                index = InventoryIndex(build())
+                with self._lock:
+                    self._indexes[key] = index
+            return index
+
+    def invalidate(self, key):
+        with self._lock:
+            self._indexes.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+inventory_indexes = IndexRegistry()
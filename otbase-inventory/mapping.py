@@ -0,0 +1,98 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+from .codec import dumps
+
+NOT_FOUND = 'Not Found'
+
+DESCRIPTION_TEMPLATE = '''{hardware_description}
+
+<style>
+    table, th, td {{
+    border: 1px solid black;
+    border-collapse: collapse;
+    }}
+</style>
+<table border="1" style="width:100%">
+    <tr>
+        <th style="width:10%">Name</th>
+        <th style="width:10%">Description</th>
+        <th style="width:10%">Criticality</th>
+        <th style="width:10%">Vendor</th>
+        <th style="width:10%">Vendor Link</th>
+        <th style="width:10%">Model</th>
+        <th style="width:10%">Stage</th>
+        <th style="width:10%">Modified Time</th>
+    </tr>
+    <tbody>
+        <tr>
+            <td>{name}</td>
+            <td>{description}</td>
+            <td>{criticality}</td>
+            <td>{vendor}</td>
+            <td>{vendor_link}</td>
+            <td>{model}</td>
+            <td>{stage}</td>
+            <td>{modified}</td>
+        </tr>
+    </tbody>
+</table>'''
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _or_not_found(value):
+    return value if value else NOT_FOUND
+
+
+def device_to_asset(device):
+    """Map an OTbase device to the fields of a FortiSOAR asset record in a single pass.
+
+    Produces the same values the "Fetch and Create" playbook used to render with Jinja, except
+    for the picklist and tag fields, which are resolved by the playbook, and for the source data,
+    which is compact JSON.
+    """
+    hardware = device.get('hardware') or {}
+    context = device.get('context') or {}
+    ip_addresses, mac_addresses, networks = [], [], []
+    for connection in device.get('connections') or []:
+        if connection.get('L3Address'):
+            ip_addresses.append(_text(connection.get('L3Address')))
+        if connection.get('L2Address'):
+            mac_addresses.append(_text(connection.get('L2Address')))
+        if connection.get('networkId'):
+            networks.append(_text(connection.get('networkId')))
+    location = _text(context.get('location'))
+    return {
+        'deviceUid': device.get('deviceId'),
+        'name': '{0} - {1} - {2}'.format(location.split('/')[0], _text(hardware.get('type')),
+                                         _text(device.get('name'))),
+        'ip': ','.join(ip_addresses),
+        'macAddress': ','.join(mac_addresses),
+        'network': ','.join(networks),
+        'tag': ','.join(_text(tag) for tag in device.get('tags') or []),
+        'zone': device.get('zone'),
+        'vendor': hardware.get('vendor'),
+        'product': hardware.get('model'),
+        'firmware': device.get('os_firmware'),
+        'hostname': device.get('description'),
+        'location': context.get('location'),
+        'serialNumber': hardware.get('orderNumber'),
+        'description': DESCRIPTION_TEMPLATE.format(
+            hardware_description=_text(hardware.get('description')),
+            name=_or_not_found(device.get('name')),
+            description=_or_not_found(device.get('description')),
+            criticality=_or_not_found(device.get('criticality')),
+            vendor=_or_not_found(hardware.get('vendor')),
+            vendor_link=_or_not_found(hardware.get('vendorLink')),
+            model=_or_not_found(hardware.get('model')),
+            stage=_or_not_found(device.get('stage')),
+            modified=_or_not_found(device.get('modified'))),
+        'sourceData': dumps(device)
+    }
@@ -0,0 +1,293 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LATENCY_PHASES = ('connect', 'ttfb', 'total')
+PROMETHEUS_PREFIX = 'otbase_inventory'
+# Prometheus exports are only written in this directory of the connector's data directory
+PROMETHEUS_EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'metrics')
+PROMETHEUS_EXTENSION = '.prom'
+
+
+def endpoint_label(endpoint):
+    """Collapse the IDs of detail endpoints, so that ``devices/42`` and ``devices/43`` share one series."""
+    parts = str(endpoint).strip('/').split('/')
+    return parts[0] + ''.join('/{id}' for _ in parts[1:])
+
+
+class Histogram(object):
+    """Cumulative bucket histogram, in the Prometheus sense."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def cumulative(self):
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append(('+Inf' if bound == float('inf') else repr(bound), total))
+        return result
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q quantile; an estimate, as in Prometheus."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for label, total in self.cumulative():
+            if total >= rank:
+                return label if label == '+Inf' else float(label)
+        return None
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(self.cumulative())
+        }
+
+
+class _EndpointStats(object):
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.bytes = 0
+        self.status = {}
+        self.latency = {phase: Histogram() for phase in LATENCY_PHASES}
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'cache_hits': self.cache_hits,
+            'bytes': self.bytes,
+            'status': dict(self.status),
+            'latency': {phase: histogram.to_dict() for phase, histogram in self.latency.items()}
+        }
+
+
+class _OperationStats(object):
+
+    def __init__(self):
+        self.executions = 0
+        self.errors = 0
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.duration = Histogram()
+
+    def to_dict(self):
+        return {
+            'executions': self.executions,
+            'errors': self.errors,
+            'requests': self.requests,
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'duration': self.duration.to_dict()
+        }
+
+
+# The operation requests are attributed to: per thread, and carried over to the coroutines that a
+# thread submits to the event loop
+_current_operation = contextvars.ContextVar('otbase_operation', default=None)
+
+
+class MetricsRegistry(object):
+    """Request and operation metrics of a worker, kept in memory until the worker restarts or they are reset."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._endpoints = {}
+            self._operations = {}
+
+    def current_operation(self):
+        return _current_operation.get()
+
+    @contextmanager
+    def track_operation(self, operation):
+        """Time an operation execution; requests made on behalf of it are attributed to it."""
+        token = _current_operation.set(operation)
+        started = time.monotonic()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _current_operation.reset(token)
+            with self._lock:
+                stats = self._operations.setdefault(operation, _OperationStats())
+                stats.executions += 1
+                stats.errors += failed
+                stats.duration.observe(time.monotonic() - started)
+
+    def _endpoint(self, method, endpoint):
+        key = '{0} {1}'.format(method, endpoint_label(endpoint))
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints[key] = _EndpointStats()
+        return stats
+
+    def record_request(self, operation, method, endpoint, status=None, connect=0.0, ttfb=None, total=None,
+                       size=0, retries=0):
+        """Record one logical request; ``status`` is None when no response was received."""
+        with self._lock:
+            stats = self._endpoint(method, endpoint)
+            stats.requests += 1
+            stats.retries += retries
+            stats.bytes += size
+            status = str(status) if status is not None else 'error'
+            stats.status[status] = stats.status.get(status, 0) + 1
+            if status == 'error' or int(status) >= 400:
+                stats.errors += 1
+            if connect:
+                stats.latency['connect'].observe(connect)
+            if ttfb is not None:
+                stats.latency['ttfb'].observe(ttfb)
+            if total is not None:
+                stats.latency['total'].observe(total)
+            if operation:
+                operation_stats = self._operations.setdefault(operation, _OperationStats())
+                operation_stats.requests += 1
+                operation_stats.retries += retries
+                operation_stats.bytes += size
+
+    def record_cache_hit(self, method, endpoint):
+        with self._lock:
+            self._endpoint(method, endpoint).cache_hits += 1
+
+    def snapshot(self, **extra):
+        with self._lock:
+            result = {
+                'started_at': datetime.fromtimestamp(self.started_at, timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                'uptime_seconds': round(time.time() - self.started_at, 3),
+                'process_id': os.getpid(),
+                'endpoints': {key: stats.to_dict() for key, stats in sorted(self._endpoints.items())},
+                'operations': {key: stats.to_dict() for key, stats in sorted(self._operations.items())}
+            }
+        result.update(extra)
+        return result
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{0}="{1}"'.format(k, _escape(v)) for k, v in labels.items()) + '}'
+
+
+def to_prometheus(snapshot):
+    """Render a snapshot in the Prometheus text exposition format."""
+    p = PROMETHEUS_PREFIX
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append('# HELP {0}_{1} {2}'.format(p, name, help_text))
+        lines.append('# TYPE {0}_{1} {2}'.format(p, name, kind))
+        for suffix, labels, value in samples:
+            lines.append('{0}_{1}{2}{3} {4}'.format(p, name, suffix, _labels(**labels), value))
+
+    def histogram_samples(histogram, **labels):
+        samples = [('_bucket', dict(labels, le=le), count) for le, count in histogram['buckets'].items()]
+        samples.append(('_sum', labels, histogram['sum']))
+        samples.append(('_count', labels, histogram['count']))
+        return samples
+
+    endpoints = [(key.split(' ', 1), stats) for key, stats in snapshot['endpoints'].items()]
+    metric('requests_total', 'counter', 'REST requests sent to OTbase Inventory.', [
+        ('', {'method': m, 'endpoint': e, 'status': status}, count)
+        for (m, e), stats in endpoints for status, count in sorted(stats['status'].items())])
+    metric('request_retries_total', 'counter', 'Retried REST request attempts.', [
+        ('', {'method': m, 'endpoint': e}, stats['retries']) for (m, e), stats in endpoints])
+    metric('response_cache_hits_total', 'counter', 'Requests served from the response cache.', [
+        ('', {'method': m, 'endpoint': e}, stats['cache_hits']) for (m, e), stats in endpoints])
+    metric('response_bytes_total', 'counter', 'Bytes of response bodies received.', [
+        ('', {'method': m, 'endpoint': e}, stats['bytes']) for (m, e), stats in endpoints])
+    for phase in LATENCY_PHASES:
+        samples = []
+        for (m, e), stats in endpoints:
+            samples.extend(histogram_samples(stats['latency'][phase], method=m, endpoint=e))
+        metric('request_{0}_seconds'.format(phase), 'histogram',
+               'REST request {0} latency in seconds.'.format(phase), samples)
+    operations = snapshot['operations'].items()
+    metric('operation_executions_total', 'counter', 'Connector operation executions.', [
+        ('', {'operation': name}, stats['executions']) for name, stats in operations])
+    metric('operation_errors_total', 'counter', 'Failed connector operation executions.', [
+        ('', {'operation': name}, stats['errors']) for name, stats in operations])
+    samples = []
+    for name, stats in operations:
+        samples.extend(histogram_samples(stats['duration'], operation=name))
+    metric('operation_duration_seconds', 'histogram', 'Connector operation duration in seconds.', samples)
+    cache = snapshot.get('response_cache')
+    if cache:
+        metric('response_cache_hit_ratio', 'gauge', 'Hit ratio of the response cache.',
+               [('', {}, cache['hit_rate'])])
+    validators = snapshot.get('validators')
+    if validators:
+        metric('not_modified_responses_total', 'counter', 'Conditional requests answered with a 304.',
+               [('', {}, validators['not_modified'])])
+        metric('not_modified_bytes_saved_total', 'counter', 'Body bytes not downloaded again thanks to a 304.',
+               [('', {}, validators['bytes_saved'])])
+    return '\n'.join(lines) + '\n'
+
+
+def prometheus_path(name, export_dir=PROMETHEUS_EXPORT_DIR):
+    """Resolve the file name of a Prometheus export; paths that lead out of the export directory are rejected."""
+    export_dir = os.path.realpath(export_dir)
+    path = os.path.realpath(os.path.join(export_dir, str(name).strip()))
+    if os.path.dirname(path) != export_dir or not path.endswith(PROMETHEUS_EXTENSION):
+        raise ValueError('The Prometheus file must be a {0} file in {1}: {2}'.format(
+            PROMETHEUS_EXTENSION, export_dir, name))
+    return path
+
+
+def write_prometheus(snapshot, path):
+    # Written next to the target and renamed, so that a scraper never reads a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'w') as handle:
+        handle.write(to_prometheus(snapshot))
+    os.replace(temp_path, path)
+
+
+metrics = MetricsRegistry()
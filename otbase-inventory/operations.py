@@ -5,67 +5,124 @@ Copyright (c) 2024 Fortinet Inc
 Copyright end
 """
 
-from datetime import datetime
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 import requests
-import requests_pkcs12
 from connectors.core.connector import ConnectorError, get_logger
+from urllib3.util import make_headers
+
+from .aggregation import FlowAggregator, DEFAULT_FLOW_FIELDS, DEFAULT_GROUP_BY, DEFAULT_TOP_N
+from .cache import response_cache, validator_store
+from .codec import loads
+from .debug import DebugMode, debug_trace
+from .device_model import compact_devices, to_dicts
+from .inventory_index import inventory_indexes, DEFAULT_REFRESH_INTERVAL
+from .mapping import device_to_asset
+from .metrics import metrics, prometheus_path, write_prometheus
+from .projection import include_for_fields, parse_fields, project
+from .streaming import JSONArrayStream
+from .sync_store import DeviceSyncStore, device_digest, scope_key, store_name
+from .vulnerability_join import VulnerabilityJoin
+from .transport import (connection_pool_size, governors, session_pool, request_timeout, take_connect_time,
+                        RetryPolicy)
 
 logger = get_logger("otbase-inventory")
 
 headers = {
     'Accept': 'application/json',
-    'Content-Type': 'application/json'
+    'Content-Type': 'application/json',
+    # Every content coding urllib3 can decode here: gzip and deflate, br with brotli, zstd with zstandard
+    'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding']
 }
 
+# Upper bound on the number of records a "fetch all" operation aggregates in memory
+DEFAULT_MAX_RECORDS = 10000
+# Number of pages requested ahead of the one being processed while fetching all pages
+PREFETCH_PAGES = 4
+# Default number of concurrent requests used by the bulk operations
+DEFAULT_CONCURRENCY = 5
+# Number of devices a listing keeps as plain dicts before holding the rest in the compact device model
+COMPACT_DEVICES_AFTER = 2000
+# Size of the chunks read from the socket when decoding a streamed response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Naive and ISO-8601 timestamps: date, optional time, optional fraction and optional UTC offset
+DATETIME_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}:\d{2})(:\d{2})?(?:\.\d+)?)?\s*(Z|[+-]\d{2}:?\d{2})?$')
+EPOCH_PATTERN = re.compile(r'^\d+(?:\.\d+)?$')
+INTEGER_PATTERN = re.compile(r'^-?\d+$')
+
+
+def _load_parameter_types():
+    """Map every action parameter name declared in info.json to its type."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'info.json'), 'r') as info_file:
+        info = json.load(info_file)
+    parameter_types = {}
+
+    def collect(parameters):
+        for parameter in parameters:
+            parameter_types.setdefault(parameter.get('name'), parameter.get('type'))
+            for nested in (parameter.get('onchange') or {}).values():
+                collect(nested)
+
+    for operation in info.get('operations', []):
+        collect(operation.get('parameters', []))
+    return parameter_types
+
+
+PARAMETER_TYPES = _load_parameter_types()
+# Returned by OTBase._result when a request has to be sent again
+_REQUEST_AGAIN = object()
+
 
 class OTBase(object):
     def __init__(self, config, *args, **kwargs):
+        self.config = config
         self.username = config.get('username')
         self.password = config.get('password')
-        if config.get('pfx_path') is not None:
-            self.pfx_path = config.get('pfx_path')
-            self.pfx_password = config.get('pfx_password')
+        self.pfx_path = config.get('pfx_path')
+        self.pfx_password = config.get('pfx_password')
         url = config.get('server_url').strip('/')
         if not url.startswith('https://') and not url.startswith('http://'):
             self.base_url = 'https://{0}/ot-base/api/v1/'.format(url)
         else:
             self.base_url = url + '/ot-base/api/v1/'
         self.verify_ssl = config.get('verify_ssl')
+        self.timeout = request_timeout(config)
+        self.retry_policy = RetryPolicy.from_config(config)
+        self.governor = governors.get(config)
+        self.debug = DebugMode(config)
+        # Requests are attributed to the operation that created the client, including those
+        # sent from the bulk and prefetch worker threads
+        self.operation = metrics.current_operation()
 
-    def make_rest_call(self, endpoint, method, data=None, params=None):
+    def make_rest_call(self, endpoint, method, data=None, params=None, stream=False):
         try:
-            url = self.base_url + endpoint
-            logger.debug("Endpoint {0}".format(url))
-            # CURL UTILS CODE
+            url, cache_key, cache_ttl, validators, cached = self._prepare(endpoint, method, data, params)
+            if cached is not None:
+                return cached
+            # Sessions are pooled per configuration so that keep-alive connections (and the
+            # PKCS#12 client certificate) are reused across operations in the same worker
+            session = session_pool.get(self.config)
             try:
-                from connectors.debug_utils.curl_script import make_curl
-                make_curl(method, url, headers=headers, params=params, data=data, verify_ssl=self.verify_ssl)
+                response = self._send(session, method, url, data=data, params=params, stream=stream,
+                                      extra_headers=validators)
             except Exception as err:
-                logger.error(f"Error in curl utils: {str(err)}")
-
-            if self.pfx_path:
-                response = requests_pkcs12.request(url=url,
-                                                   method=method, auth=(self.username, self.password),
-                                                   pkcs12_filename=self.pfx_path,
-                                                   pkcs12_password=self.pfx_password,
-                                                   verify=self.verify_ssl, data=data, params=params, headers=headers)
-            else:
-                response = requests.request(method, url, data=data, params=params, auth=(self.username, self.password),
-                                            headers=headers,
-                                            verify=self.verify_ssl)
-            # logger.debug("response_content {0}:{1}".format(response.status_code, response.content))
-            if response.ok or response.status_code == 204:
-                logger.info('Successfully got response for url {0}'.format(url))
-                if 'json' in str(response.headers):
-                    return response.json()
-                else:
-                    return response
-            elif response.status_code == 404:
-                return response
-            else:
-                logger.error("{0}".format(response.status_code))
-                raise ConnectorError("{0}:{1}".format(response.status_code, response.content))
+                if self.debug.record:
+                    debug_trace.record(method, url, params, data, error=err)
+                raise
+            if self.debug.record:
+                debug_trace.record(method, url, params, data, response, stream=stream)
+            result = self._result(endpoint, method, url, response, stream, cache_key, cache_ttl, validators)
+            if result is _REQUEST_AGAIN:
+                return self.make_rest_call(endpoint, method, data=data, params=params, stream=stream)
+            return result
         except requests.exceptions.SSLError:
             logger.error('SSL certificate validation failed')
             raise ConnectorError('SSL certificate validation failed')
@@ -82,83 +139,588 @@ class OTBase(object):
             logger.error(str(err))
             raise ConnectorError(str(err))
 
+    def _prepare(self, endpoint, method, data, params):
+        """URL, cache key and TTL, conditional headers and cached result of a request, whatever its transport."""
+        url = self.base_url + endpoint
+        logger.debug("Endpoint {0}".format(url))
+        cache_ttl = response_cache.ttl_for(endpoint) if method == 'GET' else None
+        cache_key = None
+        if cache_ttl:
+            cache_key = response_cache.make_key(self.base_url, self.username, endpoint, params)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug('Serving {0} from the response cache'.format(url))
+                metrics.record_cache_hit(method, endpoint)
+                return url, cache_key, cache_ttl, {}, cached
+        # An expired response is revalidated instead of downloaded again, when the server sent validators
+        validators = validator_store.conditional_headers(cache_key) if cache_ttl else {}
+        if self.debug.enabled:
+            self.debug.request(method, url, headers=dict(headers, **validators), params=params, data=data,
+                               verify_ssl=self.verify_ssl)
+        return url, cache_key, cache_ttl, validators, None
+
+    def _result(self, endpoint, method, url, response, stream, cache_key, cache_ttl, validators):
+        """Decode and cache a response; _REQUEST_AGAIN when a 304 validated a response that is no longer stored."""
+        # logger.debug("response_content {0}:{1}".format(response.status_code, response.content))
+        if response.status_code == 304 and validators:
+            # requests counts a 304 as ok, but it has no body: serve the one it validated
+            result = validator_store.revalidated(cache_key)
+            if result is None:
+                logger.debug('Validators of {0} were evicted, requesting it again'.format(url))
+                return _REQUEST_AGAIN
+            logger.info('Not modified since the last request for url {0}'.format(url))
+            response_cache.set(cache_key, result, cache_ttl)
+            return result
+        if response.ok or response.status_code == 204:
+            logger.info('Successfully got response for url {0}'.format(url))
+            if method != 'GET':
+                response_cache.invalidate(self.base_url, endpoint)
+                validator_store.invalidate(self.base_url, endpoint)
+            if stream:
+                return response
+            # A 204 has no body to decode, whatever its Content-Type says
+            if response.status_code != 204 and 'json' in str(response.headers):
+                result = loads(response.content)
+                if cache_ttl:
+                    response_cache.set(cache_key, result, cache_ttl)
+                    validator_store.store(cache_key, response.headers, result, len(response.content))
+                return result
+            else:
+                return response
+        elif response.status_code == 404:
+            return response
+        else:
+            logger.error("{0}".format(response.status_code))
+            raise ConnectorError("{0}:{1}".format(response.status_code, response.content))
+
+    def stream_records(self, endpoint, params=None, key='data'):
+        """Request a list endpoint and incrementally decode its records instead of buffering the body.
+
+        Returns a JSONArrayStream yielding the items of ``key``; the remaining top level members
+        (``info``) are in its ``fields``. Returns None when the endpoint answers 404.
+        """
+        response = self.make_rest_call(endpoint, 'GET', params=params, stream=True)
+        if response.status_code == 404 or response.status_code == 204:
+            response.close()
+            return None
+        return JSONArrayStream(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), key=key)
+
+    def _send(self, session, method, url, data=None, params=None, stream=False, extra_headers=None):
+        request_headers = dict(headers, **extra_headers) if extra_headers else headers
+        attempts = self.retry_policy.attempts(method)
+        attempt = 0
+        response = None
+        sent = None
+        take_connect_time()
+        try:
+            while True:
+                attempt += 1
+                response = None
+                try:
+                    with self.governor.acquire():
+                        # Latencies exclude the time spent waiting on the rate limit
+                        sent = time.monotonic()
+                        response = session.request(method, url, data=data, params=params,
+                                                   auth=(self.username, self.password), headers=request_headers,
+                                                   verify=self.verify_ssl, timeout=self.timeout, stream=stream)
+                except requests.exceptions.SSLError:
+                    raise
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
+                    if attempt >= attempts:
+                        raise
+                    delay = self.retry_policy.delay(attempt)
+                    logger.warning('Attempt {0} for {1} failed ({2}), retrying in {3:.1f}s'.format(
+                        attempt, url, err.__class__.__name__, delay))
+                    time.sleep(delay)
+                    continue
+                if attempt < attempts and self.retry_policy.should_retry(response):
+                    delay = self.retry_policy.delay(attempt, response)
+                    logger.warning('Attempt {0} for {1} returned {2}, retrying in {3:.1f}s'.format(
+                        attempt, url, response.status_code, delay))
+                    response.close()
+                    time.sleep(delay)
+                    continue
+                return response
+        finally:
+            self._record(method, url, response, sent, attempt - 1, stream)
+
+    def _record(self, method, url, response, sent, retries, stream, connect=None):
+        total = time.monotonic() - sent if sent is not None else None
+        if connect is None:
+            connect = take_connect_time()
+        if response is None:
+            metrics.record_request(self.operation, method, url[len(self.base_url):], total=total,
+                                   connect=connect, retries=retries)
+            return
+        if stream:
+            # The body of a streamed response has not been read yet
+            size = int(response.headers.get('Content-Length') or 0)
+        else:
+            size = _received_bytes(response)
+        elapsed = getattr(response, 'elapsed', None)
+        metrics.record_request(self.operation, method, url[len(self.base_url):], status=response.status_code,
+                               connect=connect, ttfb=elapsed.total_seconds() if elapsed else None,
+                               total=total, size=size, retries=retries)
+
+
+def _received_bytes(response):
+    """Size of a body as received, compressed or not; its decoded size when the transport does not tell."""
+    received = getattr(response, 'received', None)
+    if received is None:
+        tell = getattr(getattr(response, 'raw', None), 'tell', None)
+        received = tell() if callable(tell) else None
+    return received if isinstance(received, int) and received > 0 else len(response.content or b'')
+
+
+def normalize_datetime(value):
+    """Convert an epoch (seconds or milliseconds), ISO-8601 or naive timestamp to the format the API expects.
+
+    Timestamps without an offset, or with 'Z', keep their wall clock time; explicit offsets are
+    converted to UTC.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _format_epoch(value)
+    text = str(value).strip()
+    match = DATETIME_PATTERN.match(text)
+    if match:
+        date, hours_minutes, seconds, offset = match.groups()
+        if offset is None or offset == 'Z':
+            return '{0} {1}{2}'.format(date, hours_minutes or '00:00', seconds or ':00')
+        if ':' not in offset:
+            offset = offset[:3] + ':' + offset[3:]
+        aware = datetime.fromisoformat('{0}T{1}{2}{3}'.format(date, hours_minutes or '00:00', seconds or ':00', offset))
+        return aware.astimezone(timezone.utc).strftime(DATETIME_FORMAT)
+    if EPOCH_PATTERN.match(text):
+        return _format_epoch(float(text))
+    raise ConnectorError('Invalid date time value: {0}'.format(value))
+
+
+def _format_epoch(value):
+    if value > 1e11:
+        value = value / 1000.0
+    # In UTC, like timestamps with an offset and the watermarks of the sync actions
+    return datetime.fromtimestamp(value, timezone.utc).strftime(DATETIME_FORMAT)
+
 
 def check_payload(payload):
+    """Drop empty values and normalize parameters according to their info.json type, in one pass."""
     result = {}
     for k, v in payload.items():
-        if (k == 'modified' or k == 'last_seen') and v:
-            if isinstance(v, str):
-                if is_correct_format(v):
-                    result[k] = v
-                else:
-                    dt = datetime.strptime(v, "%Y-%m-%dT%H:%M:%S.%fZ")
-                    output_timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-                    result[k] = output_timestamp
-            elif isinstance(v, int):
-                dt = datetime.fromtimestamp(v)
-                formatted_time = dt.strftime("%Y-%m-%d %H:%M:%S")
-                result[k] = formatted_time
+        if v is None or v == '':
+            continue
+        param_type = PARAMETER_TYPES.get(k)
+        if param_type == 'datetime' and not isinstance(v, (dict, list)):
+            result[k] = normalize_datetime(v)
+            continue
+        if param_type == 'integer' and isinstance(v, str) and INTEGER_PATTERN.match(v.strip()):
+            v = int(v)
+        if param_type == 'multiselect' and isinstance(v, list):
+            # The API takes the selected options (include groups, priorities) as one lowercase list
+            v = ','.join(str(item).strip().lower() for item in v if item is not None and str(item).strip())
+            if v:
+                result[k] = v
             continue
         if isinstance(v, dict):
             x = check_payload(v)
-            if len(x.keys()) > 0:
+            if x:
                 result[k] = x
         elif isinstance(v, list):
             p = []
             for c in v:
                 if isinstance(c, dict):
                     x = check_payload(c)
-                    if len(x.keys()) > 0:
+                    if x:
                         p.append(x)
                 elif c is not None and c != '':
                     p.append(c)
-            if p != []:
+            if p:
                 result[k] = p
-        elif v is not None and v != '':
+        else:
             result[k] = v
     return result
 
 
-def is_correct_format(date_string):
+def _next_offset(offset, count, info):
+    """Offset of the page following one of ``count`` records at ``offset``, or None on the last page."""
+    if not count:
+        return None
+    next_offset = info.get('next_offset')
+    if next_offset is None or next_offset == '':
+        total = info.get('total')
+        next_offset = offset + count
+        if total is None or total == '' or next_offset >= int(total):
+            return None
+    next_offset = int(next_offset)
+    if next_offset <= offset:
+        return None
+    return next_offset
+
+
+def iter_pages(lan, endpoint, payload, prefetch=0):
+    """Yield the responses of a list endpoint page by page, walking offset until it is exhausted.
+
+    With ``prefetch`` set, up to that many of the following pages are requested concurrently
+    while the current one is being consumed; pages are still yielded in offset order.
+    """
+    payload = dict(payload)
+    offset = int(payload.get('offset') or 0)
+    while True:
+        payload['offset'] = offset
+        response = lan.make_rest_call(endpoint, 'GET', params=payload)
+        if not isinstance(response, dict):
+            return
+        yield response
+        next_offset = _next_offset(offset, len(response.get('data') or []), response.get('info') or {})
+        if next_offset is None:
+            return
+        total = (response.get('info') or {}).get('total')
+        if prefetch and total is not None and total != '':
+            # The page size and total are known from here on, so the remaining offsets can be
+            # requested ahead of the consumer
+            stride = next_offset - offset
+            for page in _iter_prefetched_pages(lan, endpoint, payload, range(next_offset, int(total), stride),
+                                               prefetch):
+                yield page
+            return
+        offset = next_offset
+
+
+def _iter_prefetched_pages(lan, endpoint, payload, offsets, prefetch):
+    offsets = iter(offsets)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix='otbase-prefetch')
+
+    def submit_next():
+        offset = next(offsets, None)
+        if offset is None:
+            return
+        page_payload = dict(payload, offset=offset)
+        pending.append(executor.submit(lan.make_rest_call, endpoint, 'GET', params=page_payload))
+
     try:
-        datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S")
-        return True
-    except Exception:
-        return False
+        for _ in range(prefetch):
+            submit_next()
+        while pending:
+            response = pending.popleft().result()
+            # Only top up the window when the consumer asks for the next page, so a slow
+            # consumer never has more than `prefetch` requests outstanding
+            submit_next()
+            if not isinstance(response, dict) or not response.get('data'):
+                return
+            yield response
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def iter_records(lan, endpoint, payload, prefetch=0, stream=False):
+    """Yield the individual records of a list endpoint across all of its pages.
+
+    With ``stream`` set, each page is decoded incrementally so that only one record is held in
+    memory at a time; pages are then requested one after the other.
+    """
+    if stream:
+        for record in _iter_streamed_records(lan, endpoint, payload):
+            yield record
+        return
+    for page in iter_pages(lan, endpoint, payload, prefetch=prefetch):
+        for record in page.get('data') or []:
+            yield record
+
+
+def _iter_streamed_records(lan, endpoint, payload):
+    payload = dict(payload)
+    offset = int(payload.get('offset') or 0)
+    while True:
+        payload['offset'] = offset
+        records = lan.stream_records(endpoint, params=payload)
+        if records is None:
+            return
+        count = 0
+        for record in records:
+            count += 1
+            yield record
+        offset = _next_offset(offset, count, records.fields.get('info') or {})
+        if offset is None:
+            return
+
+
+def fetch_all_pages(lan, endpoint, payload, max_records=None, fields=None, model=None):
+    """Aggregate the records of every page; ``model`` holds them in a compact form until they are returned."""
+    max_records = int(max_records or DEFAULT_MAX_RECORDS)
+    records = []
+    info = {}
+    truncated = False
+    for page in iter_pages(lan, endpoint, payload, prefetch=PREFETCH_PAGES):
+        if not info:
+            info = {k: v for k, v in (page.get('info') or {}).items() if k not in ('offset', 'next_offset')}
+        data = project(page.get('data') or [], fields)
+        if model:
+            data = [model(record) for record in data]
+        if len(records) + len(data) > max_records:
+            records.extend(data[:max_records - len(records)])
+            truncated = True
+            break
+        records.extend(data)
+    info.update({'fetched': len(records), 'truncated': truncated})
+    if truncated:
+        logger.warning('Stopped fetching {0} after {1} records'.format(endpoint, max_records))
+    return {'data': to_dicts(records) if model else records, 'info': info}
+
+
+def _list_response(lan, endpoint, params, fields=None, model=None):
+    fetch_all = params.pop('fetch_all', False)
+    max_records = params.pop('max_records', None)
+    payload = check_payload(params)
+    if fetch_all:
+        return fetch_all_pages(lan, endpoint, payload, max_records, fields, model)
+    response = lan.make_rest_call(endpoint, 'GET', params=payload)
+    if fields and isinstance(response, dict) and 'data' in response:
+        response['data'] = project(response['data'], fields)
+    return response
+
+
+def _apply_fields(params):
+    """Pop the fields projection from params, replacing include with the groups those fields need."""
+    fields = parse_fields(params.pop('fields', None))
+    if fields:
+        params['include'] = include_for_fields(fields)
+    return fields
 
 
 def get_devices_list(config, params):
     lan = OTBase(config)
     endpoint = 'devices'
-    include = params.get('include')
-    if include:
-        _include = [data.lower() for data in include]
-        _include_str = ",".join(_include)
-        params.update({'include': _include_str})
-    payload = check_payload(params)
-    response = lan.make_rest_call(endpoint, 'GET', params=payload)
+    fields = _apply_fields(params)
+    # A projection already keeps only a few members of each device, the compact model is for full devices
+    model = None if fields else compact_devices(COMPACT_DEVICES_AFTER)
+    response = _list_response(lan, endpoint, params, fields, model)
     return response
 
 
+def _sync_devices(config, params, consumer, transform=None):
+    lan = OTBase(config)
+    endpoint = 'devices'
+    detect_deleted = params.pop('detect_deleted', False)
+    reset_state = params.pop('reset_state', False)
+    acknowledge = params.pop('acknowledge', False)
+    consumer = str(params.pop('consumer', None) or '').strip() or consumer
+    initial_watermark = check_payload({'modified': params.pop('modified', None)}).get('modified')
+    payload = check_payload(params)
+    scope = scope_key({k: v for k, v in payload.items() if k not in ('count', 'offset')}, consumer)
+    next_watermark = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    with DeviceSyncStore(store_name(config)) as store:
+        if reset_state:
+            store.reset(scope)
+        watermark = store.get_watermark(scope) or initial_watermark
+        known = store.get_digests(scope)
+        # Deletions can only be detected from a full listing of the scope, so the watermark
+        # filter is applied only when they are not requested
+        if watermark and not detect_deleted:
+            payload['modified'] = watermark
+        seen = {}
+        new, changed, records = [], [], []
+        compact = compact_devices(COMPACT_DEVICES_AFTER)
+        for device in iter_records(lan, endpoint, payload, stream=True):
+            device_id = device.get('deviceId')
+            digest = device_digest(device)
+            seen[device_id] = digest
+            previous = known.get(device_id)
+            if previous == digest:
+                continue
+            (new if previous is None else changed).append(device_id)
+            records.append(transform(device) if transform else compact(device))
+        deleted = [device_id for device_id in known if device_id not in seen] if detect_deleted else []
+        digests = {k: v for k, v in seen.items() if known.get(k) != v}
+        # The state only moves forward once the caller acknowledges that it has processed the devices,
+        # so that a failed or cancelled ingestion gets them again on its next run
+        if acknowledge:
+            store.save(scope, next_watermark, digests, deleted)
+            sync_token = None
+        else:
+            sync_token = store.stage(scope, next_watermark, digests, deleted)
+    return {
+        'data': to_dicts(records),
+        'new': new,
+        'changed': changed,
+        'deleted': deleted,
+        'sync_token': sync_token,
+        'info': {
+            'watermark': watermark,
+            'next_watermark': next_watermark,
+            'scanned': len(seen),
+            'unchanged': len(seen) - len(records)
+        }
+    }
+
+
+def get_devices_delta(config, params):
+    return _sync_devices(config, params, 'get_devices_delta')
+
+
+def fetch_devices_as_assets(config, params):
+    incremental = params.pop('incremental', True)
+    if incremental:
+        return _sync_devices(config, params, 'fetch_devices_as_assets', transform=device_to_asset)
+    for name in ('detect_deleted', 'reset_state', 'acknowledge', 'consumer'):
+        params.pop(name, None)
+    response = get_devices_list(config, params)
+    if not isinstance(response, dict):
+        response = {}
+    # Same members as an incremental run; a full listing has no sync state to report or acknowledge
+    return {'data': [device_to_asset(device) for device in response.get('data') or []],
+            'new': [], 'changed': [], 'deleted': [], 'sync_token': None,
+            'info': response.get('info') or {}}
+
+
+def acknowledge_devices_sync(config, params):
+    sync_token = str(params.get('sync_token') or '').strip()
+    if not sync_token:
+        raise ConnectorError('A sync token is required')
+    with DeviceSyncStore(store_name(config)) as store:
+        committed = store.commit(sync_token)
+    if committed is None:
+        raise ConnectorError('Unknown sync token: {0}. It was already acknowledged, or superseded by a newer sync '
+                             'of the same scope.'.format(sync_token))
+    return dict(committed, acknowledged=True)
+
+
 def get_device_details(config, params):
     lan = OTBase(config)
     endpoint = 'devices/{0}'.format(params.get('device_id'))
-    include = params.get('include')
-    if include:
-        _include = [data.lower() for data in include]
-        _include_str = ",".join(_include)
-        params.update({'include': _include_str})
+    fields = _apply_fields(params)
     payload = check_payload(params)
     response = lan.make_rest_call(endpoint, 'GET', params=payload)
+    if fields and isinstance(response, dict) and 'data' in response:
+        response['data'] = project(response['data'], fields)
     return response
 
 
+def _to_list(value):
+    """Normalize a list or comma separated string of IDs, dropping blanks and duplicates."""
+    if value is None:
+        return []
+    if isinstance(value, (str, int)):
+        value = str(value).split(',')
+    # dict.fromkeys keeps the first occurrence of each ID in order, in linear time
+    return list(dict.fromkeys(item for item in (str(item).strip() for item in value) if item))
+
+
+def _fan_out(config, func, items, concurrency=None):
+    """Run func over items on a bounded thread pool; returns (item, result, error) tuples in input order.
+
+    The threads are capped by the connection pool of the configuration, so that none of them waits
+    for a connection or opens one that is discarded after the request. When aiohttp is installed, the
+    connector runs the coroutines of async_operations instead.
+    """
+    concurrency = max(1, min(int(concurrency or DEFAULT_CONCURRENCY), connection_pool_size(config)))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='otbase-bulk') as executor:
+        futures = [(item, executor.submit(func, item)) for item in items]
+    outcomes = []
+    for item, future in futures:
+        try:
+            outcomes.append((item, future.result(), None))
+        except Exception as err:
+            outcomes.append((item, None, err))
+    return outcomes
+
+
+def _bulk_details_request(params):
+    """Device IDs, query parameters and projection of a bulk details request."""
+    device_ids = _to_list(params.get('device_ids'))
+    fields = _apply_fields(params)
+    payload = check_payload({'include': params.get('include')})
+    return device_ids, payload, fields
+
+
+def _fetch_device(lan, device_id, payload, fields):
+    response = lan.make_rest_call('devices/{0}'.format(device_id), 'GET', params=payload)
+    return _device_data(device_id, response, fields)
+
+
+def _device_data(device_id, response, fields):
+    if not isinstance(response, dict):
+        raise ConnectorError('Device not found: {0}'.format(device_id))
+    return project(response.get('data'), fields)
+
+
+def _bulk_details_result(device_ids, outcomes):
+    data = []
+    errors = []
+    for device_id, result, error in outcomes:
+        if error is None:
+            data.append(result)
+        else:
+            errors.append({'device_id': device_id, 'error': str(error)})
+    return {
+        'data': data,
+        'errors': errors,
+        'info': {'requested': len(device_ids), 'succeeded': len(data), 'failed': len(errors)}
+    }
+
+
+def get_devices_details_bulk(config, params):
+    lan = OTBase(config)
+    device_ids, payload, fields = _bulk_details_request(params)
+    outcomes = _fan_out(config, lambda device_id: _fetch_device(lan, device_id, payload, fields), device_ids,
+                        params.get('concurrency'))
+    return _bulk_details_result(device_ids, outcomes)
+
+
+def _is_not_found(response):
+    # make_rest_call hands back the response object of a 404 instead of raising
+    return not isinstance(response, dict) and getattr(response, 'status_code', None) == 404
+
+
+def _delete_device(lan, device_id, dry_run=False):
+    # A dry run only checks that the device exists
+    response = lan.make_rest_call('devices/{0}'.format(device_id), 'GET' if dry_run else 'DELETE')
+    return _delete_status(response, dry_run)
+
+
+def _delete_status(response, dry_run):
+    if _is_not_found(response):
+        return 'not_found'
+    return 'would_delete' if dry_run else 'deleted'
+
+
 def delete_device_details(config, params):
     lan = OTBase(config)
-    endpoint = 'devices/{0}'.format(params.get('device_id'))
-    response = lan.make_rest_call(endpoint, 'DELETE')
-    if response:
-        return {'message': 'Successfully deleted device: {0}'.format(params.get('device_id'))}
+    device_id = params.get('device_id')
+    if _delete_device(lan, device_id) == 'not_found':
+        raise ConnectorError('Device not found: {0}'.format(device_id))
+    return {'message': 'Successfully deleted device: {0}'.format(device_id)}
+
+
+def _bulk_delete_result(device_ids, outcomes, dry_run):
+    data = []
+    counts = {'deleted': 0, 'would_delete': 0, 'not_found': 0, 'error': 0}
+    for device_id, status, error in outcomes:
+        if error is not None:
+            status = 'error'
+        counts[status] += 1
+        data.append({'device_id': device_id, 'status': status, 'error': str(error) if error is not None else None})
+    return {
+        'data': data,
+        'info': {
+            'requested': len(device_ids),
+            'dry_run': bool(dry_run),
+            'deleted': counts['deleted'],
+            'would_delete': counts['would_delete'],
+            'not_found': counts['not_found'],
+            'failed': counts['error']
+        }
+    }
+
+
+def delete_devices_bulk(config, params):
+    lan = OTBase(config)
+    device_ids = _to_list(params.get('device_ids'))
+    dry_run = params.get('dry_run', False)
+    outcomes = _fan_out(config, lambda device_id: _delete_device(lan, device_id, dry_run), device_ids,
+                        params.get('concurrency'))
+    return _bulk_delete_result(device_ids, outcomes, dry_run)
 
 
 def get_vulnerabilities_list(config, params):
@@ -166,11 +728,9 @@ def get_vulnerabilities_list(config, params):
     endpoint = 'vulnerabilities'
     priority = params.get('priority')
     if priority:
-        _priority = [data.lower() for data in priority]
-        _include_priority = ",".join(_priority)
-        params.update({'include': _include_priority})
-    payload = check_payload(params)
-    response = lan.make_rest_call(endpoint, 'GET', params=payload)
+        # The listing filters priorities through its include parameter
+        params['include'] = priority
+    response = _list_response(lan, endpoint, params)
     return response
 
 
@@ -181,10 +741,34 @@ def get_vulnerability_details(config, params):
     return response
 
 
+def get_devices_vulnerabilities(config, params):
+    lan = OTBase(config)
+    priority = params.get('priority') or []
+    locationid = params.get('locationid')
+    join = VulnerabilityJoin(priority)
+    payload = check_payload({'locationid': locationid})
+    vulnerabilities_payload = check_payload({'locationid': locationid, 'include': priority})
+    for vulnerability in iter_records(lan, 'vulnerabilities', vulnerabilities_payload, stream=True):
+        join.add_vulnerability(vulnerability)
+    if join.device_cves:
+        for device in iter_records(lan, 'devices', payload, stream=True):
+            join.add_device(device)
+    return join.result()
+
+
 def get_data_flow(config, params):
     lan = OTBase(config)
     endpoint = 'dataflow'
+    aggregate = params.pop('aggregate', False)
+    group_by = _to_list(params.pop('group_by', None)) or DEFAULT_GROUP_BY
+    top_n = params.pop('top_n', None) or DEFAULT_TOP_N
+    fields = {name: str(params.pop(name, None) or default).strip() for name, default in DEFAULT_FLOW_FIELDS.items()}
     payload = check_payload(params)
+    if aggregate:
+        aggregator = FlowAggregator(group_by, **fields)
+        for record in iter_records(lan, endpoint, payload, stream=True):
+            aggregator.add(record)
+        return aggregator.result(int(top_n))
     response = lan.make_rest_call(endpoint, 'GET', params=payload)
     return response
 
@@ -192,11 +776,180 @@ def get_data_flow(config, params):
 def get_network_list(config, params):
     lan = OTBase(config)
     endpoint = 'networks'
-    payload = check_payload(params)
-    response = lan.make_rest_call(endpoint, 'GET', params=payload)
+    response = _list_response(lan, endpoint, params)
     return response
 
 
+# Shard dimensions of a sharded devices fetch: the network listing member enumerating them and the devices filter
+SHARD_KEYS = {
+    'location': ('locationId', 'locationid'),
+    'network': ('networkId', 'networkid')
+}
+
+
+def _shard_request(params):
+    """Shard dimension, explicit shard IDs, query parameters and projection of a sharded devices request."""
+    shard_by = (params.get('shard_by') or 'Location').lower()
+    if shard_by not in SHARD_KEYS:
+        raise ConnectorError('Unsupported shard type: {0}'.format(params.get('shard_by')))
+    shard_ids = _to_list(params.get('shard_ids'))
+    fields = _apply_fields(params)
+    payload = check_payload({'otsystemid': params.get('otsystemid'), 'count': params.get('count'),
+                             'include': params.get('include')})
+    return shard_by, shard_ids, payload, fields
+
+
+def _enumerate_shards(lan, shard_by):
+    """The distinct location or network IDs of the network listing, in listing order."""
+    return _shard_ids(fetch_all_pages(lan, 'networks', {}).get('data') or [], shard_by)
+
+
+def _shard_ids(networks, shard_by):
+    key = SHARD_KEYS[shard_by][0]
+    return _to_list([network.get(key) for network in networks if network.get(key)])
+
+
+def _count_devices(lan, payload):
+    """Total number of devices matching the unsharded query, from the info of a one device page."""
+    return _total_devices(lan.make_rest_call('devices', 'GET', params=_count_payload(payload)))
+
+
+def _count_payload(payload):
+    return dict({key: value for key, value in payload.items() if key != 'include'}, count=1, offset=0)
+
+
+def _total_devices(response):
+    total = (response.get('info') or {}).get('total') if isinstance(response, dict) else None
+    return None if total is None or total == '' else int(total)
+
+
+def _fetch_shard(lan, shard_by, shard_id, payload, fields, max_records, model):
+    """Stream the devices of one shard; returns them with the duration of the shard and whether it was truncated."""
+    started = time.monotonic()
+    payload = _shard_payload(payload, shard_by, shard_id)
+    devices = []
+    truncated = False
+    for device in iter_records(lan, 'devices', payload, prefetch=PREFETCH_PAGES):
+        if len(devices) >= max_records:
+            truncated = True
+            break
+        devices.append(model(project(device, fields)))
+    return _shard_outcome(shard_by, shard_id, devices, started, truncated)
+
+
+def _shard_payload(payload, shard_by, shard_id):
+    return dict(payload, **{SHARD_KEYS[shard_by][1]: shard_id})
+
+
+def _shard_outcome(shard_by, shard_id, devices, started, truncated):
+    duration = time.monotonic() - started
+    logger.info('Fetched {0} devices of {1} {2} in {3:.2f}s'.format(len(devices), shard_by, shard_id, duration))
+    return devices, duration, truncated
+
+
+def _sharded_result(shard_by, outcomes, map_to_assets, started, expected=None):
+    """Merge the shards in shard order, keeping the first occurrence of each device ID.
+
+    ``expected`` is the device count of the unsharded query; devices outside every shard, such as
+    those without a connection to a network, are reported as missing against it. When a shard
+    failed or was truncated, its unread devices cannot be told apart from those, so missing is None.
+    """
+    data, shards = [], []
+    seen = set()
+    for shard_id, result, error in outcomes:
+        shard = {'shard_id': shard_id, 'status': 'failed', 'devices': 0, 'duplicates': 0, 'duration': None,
+                 'error': str(error) if error is not None else None}
+        if error is None:
+            devices, duration, truncated = result
+            for device in devices:
+                device_id = device.get('deviceId')
+                if device_id is not None and device_id in seen:
+                    shard['duplicates'] += 1
+                    continue
+                seen.add(device_id)
+                data.append(device)
+            shard.update({'status': 'truncated' if truncated else 'completed', 'devices': len(devices),
+                          'duration': round(duration, 3)})
+        shards.append(shard)
+    complete = all(shard['status'] == 'completed' for shard in shards)
+    missing = max(expected - len(data), 0) if expected is not None and complete else None
+    if missing:
+        logger.warning('{0} of {1} devices are not in any {2} shard'.format(missing, expected, shard_by))
+    to_dicts(data)
+    if map_to_assets:
+        for position, device in enumerate(data):
+            data[position] = device_to_asset(device)
+    return {
+        'data': data,
+        'shards': shards,
+        'info': {
+            'shard_by': shard_by,
+            'shards': len(shards),
+            'failed_shards': sum(1 for shard in shards if shard['status'] == 'failed'),
+            'truncated_shards': sum(1 for shard in shards if shard['status'] == 'truncated'),
+            'devices': len(data),
+            'expected_devices': expected,
+            'missing': missing,
+            'duplicates': sum(shard['duplicates'] for shard in shards),
+            'duration': round(time.monotonic() - started, 3)
+        }
+    }
+
+
+def get_devices_sharded(config, params):
+    started = time.monotonic()
+    lan = OTBase(config)
+    shard_by, shard_ids, payload, fields = _shard_request(params)
+    # Shards enumerated from the network listing are expected to cover the whole inventory; this is
+    # checked against the total of the unsharded query. Explicit shard IDs select a part of it.
+    expected = None
+    if not shard_ids:
+        shard_ids = _enumerate_shards(lan, shard_by)
+        expected = _count_devices(lan, payload)
+    max_records = int(params.get('max_records') or DEFAULT_MAX_RECORDS)
+    model = _shard_model(fields)
+    outcomes = _fan_out(config,
+                        lambda shard_id: _fetch_shard(lan, shard_by, shard_id, payload, fields, max_records, model),
+                        shard_ids, params.get('concurrency'))
+    return _sharded_result(shard_by, outcomes, params.get('map_to_assets', False), started, expected)
+
+
+def _shard_model(fields):
+    # One model for all shards, so that their devices share one interning table
+    return (lambda device: device) if fields else compact_devices(COMPACT_DEVICES_AFTER)
+
+
+def lookup_devices(config, params):
+    lookup_type = (params.get('lookup_type') or 'IP Address').lower()
+    values = _to_list(params.get('values'))
+    max_age = params.get('refresh_interval')
+    max_age = DEFAULT_REFRESH_INTERVAL if max_age in (None, '') else int(max_age)
+
+    def build():
+        lan = OTBase(config)
+        return iter_records(lan, 'devices', {}, stream=True)
+
+    index = inventory_indexes.get(store_name(config), build, max_age=max_age,
+                                  force_refresh=params.get('force_refresh', False))
+    lookup = {
+        'ip address': index.lookup_ip,
+        'mac address': index.lookup_mac,
+        'cidr': index.lookup_cidr,
+        'network id': index.lookup_network
+    }.get(lookup_type)
+    if lookup is None:
+        raise ConnectorError('Unsupported lookup type: {0}'.format(params.get('lookup_type')))
+    data = [{'value': value, 'devices': lookup(value)} for value in values]
+    return {
+        'data': data,
+        'info': {
+            'indexed_devices': len(index.devices),
+            'built_at': datetime.fromtimestamp(index.built_at, timezone.utc).strftime(DATETIME_FORMAT),
+            'matched': sum(1 for item in data if item['devices'])
+        }
+    }
+
+
 def get_network_details(config, params):
     lan = OTBase(config)
     endpoint = 'networks/{0}'.format(params.get('network_id'))
@@ -204,6 +957,29 @@ def get_network_details(config, params):
     return response
 
 
+def get_connector_metrics(config, params):
+    snapshot = metrics.snapshot(response_cache=response_cache.stats(), validators=validator_store.stats(),
+                                governors=governors.stats())
+    prometheus_file = params.get('prometheus_file')
+    if prometheus_file:
+        try:
+            prometheus_file = prometheus_path(prometheus_file)
+        except ValueError as err:
+            raise ConnectorError(str(err))
+        try:
+            write_prometheus(snapshot, prometheus_file)
+        except OSError as err:
+            raise ConnectorError('Unable to write the metrics to {0}: {1}'.format(prometheus_file, err))
+    if params.get('reset'):
+        metrics.reset()
+    return snapshot
+
+
+def get_debug_trace(config, params):
+    entries = debug_trace.entries(clear=params.get('clear', False))
+    return {'data': entries, 'info': {'entries': len(entries)}}
+
+
 # Not needed in this version
 # def custom_endpoint(config, params):
 #     lan = OTBase(config)
@@ -231,11 +1007,21 @@ def _check_health(config):
 
 operations = {
     'get_devices_list': get_devices_list,
+    'get_devices_delta': get_devices_delta,
+    'fetch_devices_as_assets': fetch_devices_as_assets,
+    'acknowledge_devices_sync': acknowledge_devices_sync,
+    'get_devices_sharded': get_devices_sharded,
     'get_device_details': get_device_details,
+    'get_devices_details_bulk': get_devices_details_bulk,
     'delete_device_details': delete_device_details,
+    'delete_devices_bulk': delete_devices_bulk,
     'get_vulnerabilities_list': get_vulnerabilities_list,
     'get_vulnerability_details': get_vulnerability_details,
+    'get_devices_vulnerabilities': get_devices_vulnerabilities,
     'get_data_flow': get_data_flow,
     'get_network_list': get_network_list,
-    'get_network_details': get_network_details
+    'get_network_details': get_network_details,
+    'lookup_devices': lookup_devices,
+    'get_connector_metrics': get_connector_metrics,
+    'get_debug_trace': get_debug_trace
 }
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+# Top level device members that the API only returns when their include group is requested
+INCLUDE_GROUPS = {
+    'software': 'software',
+    'vulnerabilities': 'vulnerabilities',
+    'compliance': 'compliance',
+    'modules': 'modules',
+    'admins': 'admins'
+}
+
+
+def parse_fields(fields):
+    """Turn a list or comma separated string of dotted JSON paths into a nested path tree.
+
+    ``"deviceId, hardware.vendor, connections.L3Address"`` becomes
+    ``{'deviceId': {}, 'hardware': {'vendor': {}}, 'connections': {'L3Address': {}}}``; an empty
+    subtree keeps the whole value.
+    """
+    if not fields:
+        return {}
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    tree = {}
+    for path in fields:
+        path = str(path).strip()
+        if not path:
+            continue
+        node = tree
+        parts = path.split('.')
+        for index, part in enumerate(parts):
+            if part in node and not node[part]:
+                # A shorter path already keeps this whole value
+                break
+            if index == len(parts) - 1:
+                node[part] = {}
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def project(value, tree):
+    """Trim a JSON value to the paths of ``tree``; lists are projected item by item."""
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: project(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+
+def include_for_fields(tree):
+    """The minimal include groups needed to serve the top level members of ``tree``."""
+    return [group for field, group in INCLUDE_GROUPS.items() if field in tree]
@@ -0,0 +1,103 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import codecs
+import json
+import re
+
+_WHITESPACE = ' \t\n\r'
+# Characters that can follow a complete number in a JSON document
+_NUMBER_END = re.compile(r'[ \t\n\r,\]}]')
+
+
+class JSONArrayStream(object):
+    """Incrementally parse a JSON object body, yielding the items of one of its array members.
+
+    The items of ``key`` are decoded one at a time as chunks arrive, so only a single item is
+    held in memory. The other top level members (such as ``info``) are small and are collected
+    into ``fields``; those that follow the array are only available once iteration finishes.
+    """
+
+    def __init__(self, chunks, key='data', encoding='utf-8'):
+        self.key = key
+        self.fields = {}
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                self._buffer = self._buffer[self._pos:] + text
+                self._pos = 0
+                return True
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(b'', final=True)
+        self._pos = 0
+        self._eof = True
+        return False
+
+    def _peek(self):
+        """Skip whitespace and return the next significant character, or '' at the end of the body."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, characters):
+        char = self._peek()
+        if not char or char not in characters:
+            raise ValueError('Malformed JSON response: expected {0!r} at offset {1}'.format(characters, self._pos))
+        self._pos += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                if self._fill():
+                    continue
+                raise
+            # A number cut by a chunk boundary decodes as its prefix ("9." as 9, "1e" as 1); it is
+            # complete only once a delimiter follows it
+            if (isinstance(value, (int, float)) and not isinstance(value, bool) and not self._eof
+                    and not _NUMBER_END.search(self._buffer, end) and self._fill()):
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            name = self._value()
+            self._expect(':')
+            if name == self.key and self._peek() == '[':
+                self._pos += 1
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                self.fields[name] = self._value()
+            if self._expect(',}') == '}':
+                return
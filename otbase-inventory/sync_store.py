@@ -0,0 +1,127 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from connectors.core.connector import get_logger
+
+logger = get_logger("otbase-inventory")
+
+SYNC_STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Fields that change on every scan without the device itself changing; they are left out of the digest
+VOLATILE_DEVICE_FIELDS = ('last_seen', 'last_seen_by', 'days_since_last_patch')
+
+
+def device_digest(device):
+    content = {k: v for k, v in device.items() if k not in VOLATILE_DEVICE_FIELDS}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def store_name(config):
+    if config.get('config_id'):
+        return str(config.get('config_id'))
+    identity = '{0}|{1}'.format(config.get('server_url'), config.get('username'))
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+
+
+def scope_key(filters, consumer):
+    """Identify the sync state of a consumer and a set of list filters.
+
+    Syncs with different filters, or run by different consumers (actions or named playbooks), keep
+    separate watermarks, digests and pending runs, so that one never skips or drops the devices of
+    another.
+    """
+    normalized = {k: v for k, v in filters.items() if v not in (None, '', [])}
+    scope = {'consumer': consumer, 'filters': normalized}
+    return hashlib.sha1(json.dumps(scope, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class DeviceSyncStore(object):
+    """Watermark and per-device content digests of an incremental device sync, kept in SQLite.
+
+    A sync run is first staged under a token and only becomes the state of its scope once the
+    token is committed, after the caller has processed the devices. Until then, the next run of
+    the scope starts from the previous state again, so devices are delivered at least once.
+    """
+
+    def __init__(self, name, state_dir=None):
+        # Resolved at call time so that the state directory can be redirected (as the benchmarks do)
+        state_dir = state_dir or SYNC_STATE_DIR
+        if not os.path.isdir(state_dir):
+            os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, 'sync_{0}.db'.format(name))
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS watermark (scope TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS devices (scope TEXT, device_id TEXT, digest TEXT, '
+                          'PRIMARY KEY (scope, device_id))')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS pending (token TEXT PRIMARY KEY, scope TEXT, watermark TEXT, '
+                          'digests TEXT, deleted TEXT, created REAL)')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_watermark(self, scope):
+        row = self.conn.execute('SELECT value FROM watermark WHERE scope = ?', (scope,)).fetchone()
+        return row[0] if row else None
+
+    def get_digests(self, scope):
+        return dict(self.conn.execute('SELECT device_id, digest FROM devices WHERE scope = ?', (scope,)))
+
+    def _apply(self, scope, watermark, digests, deleted):
+        self.conn.executemany('INSERT OR REPLACE INTO devices (scope, device_id, digest) VALUES (?, ?, ?)',
+                              [(scope, device_id, digest) for device_id, digest in digests.items()])
+        self.conn.executemany('DELETE FROM devices WHERE scope = ? AND device_id = ?',
+                              [(scope, device_id) for device_id in deleted])
+        self.conn.execute('INSERT OR REPLACE INTO watermark (scope, value) VALUES (?, ?)', (scope, watermark))
+
+    def save(self, scope, watermark, digests, deleted=()):
+        with self.conn:
+            self._apply(scope, watermark, digests, deleted)
+
+    def stage(self, scope, watermark, digests, deleted=()):
+        """Record the outcome of a sync run without applying it; returns the token that commits it.
+
+        A newer run of the same scope supersedes a run that was never committed.
+        """
+        token = uuid.uuid4().hex
+        with self.conn:
+            self.conn.execute('DELETE FROM pending WHERE scope = ?', (scope,))
+            self.conn.execute('INSERT INTO pending (token, scope, watermark, digests, deleted, created) '
+                              'VALUES (?, ?, ?, ?, ?, ?)',
+                              (token, scope, watermark, json.dumps(digests), json.dumps(list(deleted)), time.time()))
+        return token
+
+    def commit(self, token):
+        """Apply a staged run; returns its scope, watermark and number of devices, or None for an unknown token."""
+        row = self.conn.execute('SELECT scope, watermark, digests, deleted FROM pending WHERE token = ?',
+                                (token,)).fetchone()
+        if row is None:
+            return None
+        scope, watermark, digests, deleted = row[0], row[1], json.loads(row[2]), json.loads(row[3])
+        with self.conn:
+            self._apply(scope, watermark, digests, deleted)
+            self.conn.execute('DELETE FROM pending WHERE token = ?', (token,))
+        return {'scope': scope, 'watermark': watermark, 'devices': len(digests), 'deleted': len(deleted)}
+
+    def reset(self, scope):
+        with self.conn:
+            self.conn.execute('DELETE FROM devices WHERE scope = ?', (scope,))
+            self.conn.execute('DELETE FROM watermark WHERE scope = ?', (scope,))
+            self.conn.execute('DELETE FROM pending WHERE scope = ?', (scope,))
@@ -0,0 +1,123 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+# Benchmark the JSON codec and the response compression on realistic device pages, requested with
+# include=All. Run it from the connector directory; orjson and brotli are measured when installed:
+#
+#     python tests/benchmark/codec_benchmark.py --devices 300 --include-size 10
+
+import argparse
+import gzip
+import importlib.util
+import json
+import os
+import sys
+import time
+import zlib
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+CONNECTOR_DIR = os.path.abspath(os.path.join(BENCHMARK_DIR, os.pardir, os.pardir))
+
+sys.path.insert(0, BENCHMARK_DIR)
+from mock_server import INCLUDE_GROUPS, Inventory  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def load_codec():
+    """Import the connector codec module on its own; it does not depend on the connector SDK."""
+    spec = importlib.util.spec_from_file_location('otbase_inventory_codec', os.path.join(CONNECTOR_DIR, 'codec.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def best_of(func, repeat):
+    """Fastest of ``repeat`` runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def codec_results(page, devices, repeat):
+    body = json.dumps(page).encode('utf-8')
+    size_mb = len(body) / 1048576.0
+    candidates = [('json', json.loads, lambda value: json.dumps(value))]
+    if orjson is not None:
+        candidates.append(('orjson', orjson.loads, orjson.dumps))
+    codec = load_codec()
+    candidates.append(('connector ({0})'.format(codec.JSON_CODEC), codec.loads, codec.dumps))
+    results = {}
+    for name, loads, dumps in candidates:
+        decode = best_of(lambda: loads(body), repeat)
+        # Encoding one device at a time, as the source data of each asset is
+        encode = best_of(lambda: [dumps(device) for device in devices], repeat)
+        results[name] = {'decode_ms': round(decode * 1000, 2), 'decode_mb_per_second': round(size_mb / decode, 1),
+                         'encode_ms': round(encode * 1000, 2), 'encode_mb_per_second': round(size_mb / encode, 1)}
+    return len(body), results
+
+
+def compression_results(body, repeat):
+    codings = [('identity', lambda data: data, lambda data: data),
+               ('gzip', lambda data: gzip.compress(data, compresslevel=6), gzip.decompress),
+               ('deflate', lambda data: zlib.compress(data, 6), zlib.decompress)]
+    if brotli is not None:
+        codings.append(('br', lambda data: brotli.compress(data, quality=4), brotli.decompress))
+    results = {}
+    for name, compress, decompress in codings:
+        compressed = compress(body)
+        decode = best_of(lambda: decompress(compressed), repeat)
+        results[name] = {'bytes': len(compressed), 'ratio': round(len(body) / float(len(compressed)), 1),
+                         'decompress_ms': round(decode * 1000, 2)}
+    return results
+
+
+def print_table(title, results):
+    columns = list(next(iter(results.values())))
+    width = max(len(title), max(len(label) for label in results))
+    print('{0}  {1}'.format(title.ljust(width), '  '.join(c.rjust(20) for c in columns)))
+    for label, result in results.items():
+        print('{0}  {1}'.format(label.ljust(width), '  '.join(str(result[c]).rjust(20) for c in columns)))
+    print('')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON codecs and compression on include=All device pages.')
+    parser.add_argument('--devices', type=int, default=300, help='devices per page')
+    parser.add_argument('--connections', type=int, default=3, help='connections per device')
+    parser.add_argument('--include-size', type=int, default=10, help='items per include group of a device')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    inventory = Inventory(devices=args.devices, connections=args.connections, include_size=args.include_size)
+    devices = [inventory.device(index, INCLUDE_GROUPS) for index in range(args.devices)]
+    page = {'data': devices, 'info': {'total': args.devices, 'offset': 0}}
+    size, codecs = codec_results(page, devices, args.repeat)
+    compression = compression_results(json.dumps(page).encode('utf-8'), args.repeat)
+    print('Page of {0} devices with include=All: {1} bytes\n'.format(args.devices, size))
+    print_table('codec', codecs)
+    print_table('coding', compression)
+    if args.json_path:
+        with open(args.json_path, 'w') as handle:
+            json.dump({'options': vars(args), 'page_bytes': size, 'codecs': codecs, 'compression': compression},
+                      handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+API_PREFIX = '/ot-base/api/v1/'
+DEFAULT_PAGE_SIZE = 100
+# Bodies smaller than this are sent uncompressed, as most web servers do
+COMPRESSION_MIN_SIZE = 1024
+# Last-Modified of every detail record; the inventory never changes while it is served
+LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+PRIORITIES = ('Critical', 'High', 'Medium', 'Low')
+INCLUDE_GROUPS = ('software', 'vulnerabilities', 'compliance', 'modules', 'admins')
+
+
+class Inventory(object):
+    """A synthetic OTbase inventory; records are generated from their index on demand, so a large
+    inventory costs no memory in the server."""
+
+    def __init__(self, devices=1000, connections=2, include_size=5, vulnerabilities=200, devices_per_vulnerability=10,
+                 networks=20, locations=5, flows=5000):
+        self.device_count = devices
+        self.connections = connections
+        self.include_size = include_size
+        self.vulnerability_count = vulnerabilities
+        self.devices_per_vulnerability = devices_per_vulnerability
+        self.network_count = max(1, networks)
+        self.location_count = max(1, locations)
+        self.flow_count = flows
+
+    @staticmethod
+    def device_id(index):
+        return 'D{0:06d}'.format(index)
+
+    @staticmethod
+    def cve_id(index):
+        return 'CVE-2024-{0:05d}'.format(index)
+
+    def device(self, index, include=()):
+        location = index % self.location_count
+        device = {
+            'deviceId': self.device_id(index),
+            'name': 'PLC-{0}'.format(index),
+            'description': 'plc-{0}.plant{1}.example'.format(index, location),
+            'zone': 'Zone {0}'.format(index % 4),
+            'stage': 'Operational',
+            'criticality': ('low', 'medium', 'high')[index % 3],
+            'tags': ['line-{0}'.format(index % 7)],
+            'context': {'location': 'Plant {0}/Hall {1}'.format(location, index % 3),
+                        'locationId': 'L{0}'.format(location)},
+            'hardware': {'type': 'PLC', 'vendor': 'Vendor {0}'.format(index % 11),
+                         'model': 'Model {0}'.format(index % 23), 'orderNumber': 'ORD-{0}'.format(index),
+                         'description': 'Synthetic device'},
+            'os_firmware': 'v{0}.{1}'.format(index % 5, index % 10),
+            'modified': '2024-01-{0:02d} 00:00:00'.format(index % 28 + 1),
+            'last_seen': '2024-02-01 00:00:00',
+            'connections': [self._connection(index, slot) for slot in range(self.connections)]
+        }
+        for group in include:
+            device[group] = [{'name': '{0} {1}'.format(group, item), 'version': '1.{0}'.format(item),
+                              'detail': 'x' * 64} for item in range(self.include_size)]
+        return device
+
+    def _connection(self, index, slot):
+        address = index * max(1, self.connections) + slot
+        return {
+            'L3Address': '10.{0}.{1}.{2}'.format((address >> 16) & 255, (address >> 8) & 255, address & 255),
+            'L2Address': '00:1b:1b:{0:02x}:{1:02x}:{2:02x}'.format((address >> 16) & 255, (address >> 8) & 255,
+                                                                   address & 255),
+            'networkId': 'N{0}'.format((index + slot) % self.network_count)
+        }
+
+    def device_location(self, index):
+        return 'L{0}'.format(index % self.location_count)
+
+    def vulnerability(self, index):
+        affected = sorted({(index * 7 + k * 13) % self.device_count
+                           for k in range(self.devices_per_vulnerability)}) if self.device_count else []
+        return {
+            'cveId': self.cve_id(index),
+            'priority': PRIORITIES[index % len(PRIORITIES)],
+            'severity': PRIORITIES[index % len(PRIORITIES)].lower(),
+            'baseScore': round(9.8 - (index % 60) / 10.0, 1),
+            'kev': index % 9 == 0,
+            'description': 'Synthetic vulnerability {0}'.format(index),
+            'datePublished': '2024-01-01',
+            'devices': [self.device_id(i) for i in affected]
+        }
+
+    def network(self, index):
+        return {'networkId': 'N{0}'.format(index), 'name': 'Network {0}'.format(index),
+                'address': '10.{0}.0.0/16'.format(index), 'locationId': 'L{0}'.format(index % self.location_count)}
+
+    def flow(self, index):
+        return {
+            'srcDeviceId': self.device_id(index % max(1, self.device_count)),
+            'dstDeviceId': self.device_id((index * 31 + 1) % max(1, self.device_count)),
+            'protocol': ('tcp', 'udp')[index % 2],
+            'port': (502, 102, 44818, 443)[index % 4],
+            'bytes': 100 + index % 1000,
+            'packets': 1 + index % 10,
+            'first_seen': '2024-01-01 00:00:00',
+            'last_seen': '2024-01-{0:02d} 00:00:00'.format(index % 28 + 1)
+        }
+
+
+def compress(payload, accept_encoding):
+    """(content coding, body) of the preferred coding that the client accepts; the coding is None if it accepts none."""
+    accepted = {coding.split(';')[0].strip().lower() for coding in (accept_encoding or '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br', brotli.compress(payload, quality=4)
+    if 'gzip' in accepted:
+        return 'gzip', gzip.compress(payload, compresslevel=6)
+    if 'deflate' in accepted:
+        return 'deflate', zlib.compress(payload, 6)
+    return None, payload
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # A bulk action opens its connections in one burst; with the default backlog of 5, the SYNs that
+    # overflow it are retransmitted a second later and show up as connector latency
+    request_queue_size = 256
+
+
+class MockOTBaseServer(object):
+    """Serve an :class:`Inventory` over the OTbase REST API, with injected latency and errors.
+
+    ``latency`` and ``jitter`` are in seconds; ``error_rate`` is the share of requests answered
+    with a 503 carrying a ``Retry-After: 0`` header. Detail responses carry ``ETag`` and
+    ``Last-Modified`` validators and conditional requests are answered with a 304. With
+    ``compression``, bodies are compressed with the best coding the client accepts.
+    """
+
+    def __init__(self, inventory, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                 compression=True):
+        self.inventory = inventory
+        self.compression = compression
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return 'http://{0}:{1}'.format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-otbase', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _inject(self):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            failed = self.error_rate and self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return failed
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send the headers and the body of a response in one segment; written separately, they
+            # run into delayed ACKs and add 40 ms to every request
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None, headers=None):
+                payload = json.dumps(body).encode('utf-8') if body is not None else b''
+                coding = None
+                if server.compression and len(payload) >= COMPRESSION_MIN_SIZE:
+                    coding, payload = compress(payload, self.headers.get('Accept-Encoding'))
+                self.send_response(status)
+                if body is not None:
+                    self.send_header('Content-Type', 'application/json')
+                if coding:
+                    self.send_header('Content-Encoding', coding)
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _route(self, method):
+                if server._inject():
+                    return self._send(503, {'error': 'injected failure'}, {'Retry-After': '0'})
+                parsed = urlparse(self.path)
+                if not parsed.path.startswith(API_PREFIX):
+                    return self._send(404, {'error': 'not found'})
+                query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                parts = parsed.path[len(API_PREFIX):].strip('/').split('/')
+                status, body = server.dispatch(method, parts, query)
+                if method == 'GET' and status == 200 and len(parts) > 1:
+                    return self._send_validated(body)
+                self._send(status, body)
+
+            def _send_validated(self, body):
+                payload = json.dumps(body).encode('utf-8')
+                etag = '"{0}"'.format(hashlib.sha1(payload).hexdigest())
+                validators = {'ETag': etag, 'Last-Modified': LAST_MODIFIED}
+                if_none_match = self.headers.get('If-None-Match')
+                if (if_none_match == etag or
+                        (if_none_match is None and self.headers.get('If-Modified-Since') == LAST_MODIFIED)):
+                    return self._send(304, headers=validators)
+                self._send(200, body, validators)
+
+            def do_GET(self):
+                self._route('GET')
+
+            def do_DELETE(self):
+                self._route('DELETE')
+
+        return Handler
+
+    def dispatch(self, method, parts, query):
+        inventory = self.inventory
+        resource = parts[0]
+        item = parts[1] if len(parts) > 1 else None
+        include = [group for group in INCLUDE_GROUPS
+                   if group in query.get('include', '').lower() or 'all' in query.get('include', '').lower()]
+        if resource == 'devices':
+            if item is None:
+                indexes = self._filter_devices(query)
+                return self._page(indexes, query, lambda i: inventory.device(i, include))
+            index = self._index(item, r'D(\d+)', inventory.device_count)
+            if index is None:
+                return 404, {'error': 'Device not found'}
+            if method == 'DELETE':
+                return 204, None
+            return 200, {'data': inventory.device(index, include), 'info': {'origin': 'mock'}}
+        if resource == 'vulnerabilities':
+            if item is None:
+                indexes = range(inventory.vulnerability_count)
+                priorities = [p for p in query.get('include', '').split(',') if p]
+                if priorities:
+                    indexes = [i for i in indexes if PRIORITIES[i % len(PRIORITIES)].lower() in priorities]
+                return self._page(indexes, query, inventory.vulnerability)
+            index = self._index(item, r'CVE-\d+-(\d+)', inventory.vulnerability_count)
+            if index is None:
+                return 404, {'error': 'Vulnerability not found'}
+            return 200, {'data': inventory.vulnerability(index), 'info': {'origin': 'mock'}}
+        if resource == 'networks':
+            if item is None:
+                return self._page(range(inventory.network_count), query, inventory.network)
+            index = self._index(item, r'N(\d+)', inventory.network_count)
+            if index is None:
+                return 404, {'error': 'Network not found'}
+            return 200, {'data': inventory.network(index), 'info': {'origin': 'mock'}}
+        if resource == 'dataflow':
+            return self._page(range(inventory.flow_count), query, inventory.flow)
+        return 404, {'error': 'Unknown endpoint'}
+
+    def _filter_devices(self, query):
+        indexes = range(self.inventory.device_count)
+        if query.get('locationid'):
+            indexes = [i for i in indexes if self.inventory.device_location(i) == query['locationid']]
+        if query.get('networkid'):
+            indexes = [i for i in indexes if any(c['networkId'] == query['networkid']
+                                                 for c in self.inventory.device(i)['connections'])]
+        return indexes
+
+    @staticmethod
+    def _index(item, pattern, count):
+        match = re.match(pattern + '$', item)
+        if not match or int(match.group(1)) >= count:
+            return None
+        return int(match.group(1))
+
+    @staticmethod
+    def _page(indexes, query, build):
+        indexes = list(indexes)
+        offset = int(query.get('offset') or 0)
+        count = int(query.get('count') or DEFAULT_PAGE_SIZE)
+        page = [build(i) for i in indexes[offset:offset + count]]
+        info = {'total': len(indexes), 'offset': offset, 'origin': 'mock'}
+        if offset + count < len(indexes):
+            info['next_offset'] = offset + count
+        return 200, {'data': page, 'info': info}
+
+
+def serve(inventory_options, server_options, ready=None):
+    """Run a mock server until the process is terminated; its URL is put on ``ready`` once listening."""
+    server = MockOTBaseServer(Inventory(**inventory_options), **server_options)
+    if ready is not None:
+        ready.put(server.url)
+    server.serve_forever()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Serve a synthetic OTbase Inventory API.')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--devices', type=int, default=1000)
+    parser.add_argument('--connections', type=int, default=2)
+    parser.add_argument('--include-size', type=int, default=5)
+    parser.add_argument('--vulnerabilities', type=int, default=200)
+    parser.add_argument('--flows', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.0, help='injected latency, in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--no-compression', dest='compression', action='store_false')
+    args = parser.parse_args()
+    inventory = Inventory(devices=args.devices, connections=args.connections, include_size=args.include_size,
+                          vulnerabilities=args.vulnerabilities, flows=args.flows)
+    server = MockOTBaseServer(inventory, port=args.port, latency=args.latency / 1000.0, error_rate=args.error_rate,
+                              compression=args.compression)
+    print('Serving {0}{1}'.format(server.url, API_PREFIX))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+# Benchmark every connector operation against a local mock OTbase Inventory server. Run it from the
+# connector directory, in an environment with the FortiSOAR connector SDK installed:
+#
+#     python tests/benchmark/run_benchmarks.py --devices 5000 --latency 20 --iterations 5
+#
+# The mock server runs in a separate process, so that its CPU time and memory do not count against
+# the connector.
+
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+CONNECTOR_DIR = os.path.abspath(os.path.join(BENCHMARK_DIR, os.pardir, os.pardir))
+PACKAGE_NAME = 'otbase_inventory_benchmark'
+# Operations that only act on local state handed over by another run; get_devices_delta[acknowledge]
+# measures the commit that acknowledge_devices_sync performs
+NO_SCENARIO = {'acknowledge_devices_sync'}
+
+sys.path.insert(0, BENCHMARK_DIR)
+from mock_server import Inventory, serve  # noqa: E402
+
+
+def load_connector():
+    """Import the connector directory as a package, whatever the name of its folder."""
+    package = types.ModuleType(PACKAGE_NAME)
+    package.__path__ = [CONNECTOR_DIR]
+    sys.modules[PACKAGE_NAME] = package
+    modules = {}
+    for name in ('operations', 'async_operations', 'async_transport', 'cache', 'inventory_index', 'metrics',
+                 'sync_store'):
+        modules[name] = __import__('{0}.{1}'.format(PACKAGE_NAME, name), fromlist=[name])
+    return modules
+
+
+def scenarios(inventory):
+    """(label, operation, params) of each benchmark; labels are unique, operations may repeat."""
+    device_ids = ','.join(Inventory.device_id(i) for i in range(min(50, inventory.device_count)))
+    return [
+        ('get_devices_list', 'get_devices_list', {'count': 100}),
+        ('get_devices_list[fetch_all]', 'get_devices_list', {'fetch_all': True, 'max_records': 1000000}),
+        ('get_devices_list[fields]', 'get_devices_list',
+         {'fetch_all': True, 'max_records': 1000000, 'fields': 'deviceId,connections.L3Address'}),
+        ('get_devices_delta', 'get_devices_delta', {'reset_state': True}),
+        ('get_devices_delta[acknowledge]', 'get_devices_delta', {'reset_state': True, 'acknowledge': True}),
+        ('fetch_devices_as_assets', 'fetch_devices_as_assets', {'incremental': True, 'reset_state': True}),
+        ('get_devices_sharded', 'get_devices_sharded', {'shard_by': 'Location', 'concurrency': 5}),
+        ('get_devices_sharded[network]', 'get_devices_sharded', {'shard_by': 'Network', 'concurrency': 5}),
+        ('get_device_details', 'get_device_details', {'device_id': Inventory.device_id(1), 'include': ['All']}),
+        ('get_devices_details_bulk', 'get_devices_details_bulk', {'device_ids': device_ids, 'concurrency': 5}),
+        ('delete_device_details', 'delete_device_details', {'device_id': Inventory.device_id(2)}),
+        ('delete_devices_bulk', 'delete_devices_bulk', {'device_ids': device_ids, 'concurrency': 5}),
+        ('get_vulnerabilities_list', 'get_vulnerabilities_list', {'fetch_all': True, 'max_records': 1000000}),
+        ('get_vulnerability_details', 'get_vulnerability_details', {'cve_id': Inventory.cve_id(1)}),
+        ('get_devices_vulnerabilities', 'get_devices_vulnerabilities', {'priority': ['Critical', 'High']}),
+        ('get_data_flow', 'get_data_flow', {}),
+        ('get_data_flow[aggregate]', 'get_data_flow', {'aggregate': True}),
+        ('get_network_list', 'get_network_list', {'fetch_all': True}),
+        ('get_network_details', 'get_network_details', {'network_id': 'N1'}),
+        ('lookup_devices', 'lookup_devices', {'lookup_type': 'CIDR', 'values': '10.0.0.0/24'}),
+        ('lookup_devices[subnet]', 'lookup_devices', {'lookup_type': 'CIDR', 'values': '10.0.0.0/8'}),
+        ('get_connector_metrics', 'get_connector_metrics', {}),
+        ('get_debug_trace', 'get_debug_trace', {})
+    ]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def count_records(result):
+    if isinstance(result, dict) and isinstance(result.get('data'), list):
+        return len(result['data'])
+    return 1 if result else 0
+
+
+def operation_function(modules, operation, threads=False):
+    """The operation as the connector executes it: a coroutine on the event loop when aiohttp is installed."""
+    coroutine = None
+    if not threads and modules['async_transport'].async_available():
+        coroutine = modules['async_operations'].async_operations.get(operation)
+    if coroutine is None:
+        return modules['operations'].operations[operation]
+    run_async = modules['async_transport'].run_async
+    return lambda config, params: run_async(coroutine(config, params))
+
+
+def run_scenario(modules, config, operation, params, iterations, warm, revalidate=False, threads=False):
+    func = operation_function(modules, operation, threads)
+    metrics = modules['metrics'].metrics
+
+    def run_once():
+        if not warm:
+            modules['cache'].response_cache.clear()
+            if not revalidate:
+                modules['cache'].validator_store.clear()
+            modules['inventory_index'].inventory_indexes.clear()
+        started = time.perf_counter()
+        with metrics.track_operation(operation):
+            result = func(dict(config), copy.deepcopy(params))
+        return time.perf_counter() - started, count_records(result)
+
+    run_once()
+    metrics.reset()
+    latencies, records, errors = [], 0, 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            elapsed, count = run_once()
+        except Exception as err:
+            errors += 1
+            elapsed, count = 0.0, 0
+            last_error = str(err)
+        latencies.append(elapsed)
+        records += count
+    wall = time.perf_counter() - started
+    operation_stats = metrics.snapshot()['operations'].get(operation, {})
+    requests = operation_stats.get('requests', 0)
+    received = operation_stats.get('bytes', 0)
+    # Memory is measured on a separate run, as tracing allocations slows the operation down
+    tracemalloc.start()
+    try:
+        run_once()
+    except Exception:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'ops_per_second': round(iterations / wall, 2) if wall else None,
+        'records_per_second': round(records / wall, 1) if wall else None,
+        'requests_per_run': round(float(requests) / iterations, 1),
+        'bytes_per_run': int(received / iterations),
+        'peak_memory_mb': round(peak / 1048576.0, 2)
+    }
+    if errors:
+        result['last_error'] = last_error
+    return result
+
+
+def print_report(results):
+    columns = ('p50_ms', 'p99_ms', 'ops_per_second', 'records_per_second', 'requests_per_run', 'bytes_per_run',
+               'peak_memory_mb', 'errors')
+    width = max(len(label) for label in results)
+    print('{0}  {1}'.format('operation'.ljust(width), '  '.join(c.rjust(18) for c in columns)))
+    for label, result in results.items():
+        print('{0}  {1}'.format(label.ljust(width), '  '.join(str(result.get(c)).rjust(18) for c in columns)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the OTbase Inventory connector operations offline.')
+    parser.add_argument('--devices', type=int, default=1000)
+    parser.add_argument('--connections', type=int, default=2, help='connections per device')
+    parser.add_argument('--include-size', type=int, default=5, help='items per include group of a device')
+    parser.add_argument('--vulnerabilities', type=int, default=200)
+    parser.add_argument('--networks', type=int, default=20)
+    parser.add_argument('--flows', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.0, help='injected server latency, in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='injected random extra latency, in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests failed with a 503')
+    parser.add_argument('--no-compression', dest='compression', action='store_false',
+                        help='serve uncompressed bodies whatever encodings the connector accepts')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--operations', help='comma-separated benchmark labels or operation names to run')
+    parser.add_argument('--warm', action='store_true', help='keep the response cache and device index between runs')
+    parser.add_argument('--revalidate', action='store_true',
+                        help='clear the response cache but keep the ETag validators between runs, so that details '
+                             'are revalidated with conditional requests')
+    parser.add_argument('--threads', action='store_true',
+                        help='run the bulk and sharded actions on threads even when aiohttp is installed')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    inventory_options = {'devices': args.devices, 'connections': args.connections, 'include_size': args.include_size,
+                         'vulnerabilities': args.vulnerabilities, 'networks': args.networks, 'flows': args.flows}
+    server_options = {'latency': args.latency / 1000.0, 'jitter': args.jitter / 1000.0, 'error_rate': args.error_rate,
+                      'compression': args.compression}
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(inventory_options, server_options, ready), daemon=True)
+    server.start()
+    state_dir = tempfile.mkdtemp(prefix='otbase-benchmark-')
+    try:
+        url = ready.get(timeout=30)
+        modules = load_connector()
+        modules['sync_store'].SYNC_STATE_DIR = state_dir
+        config = {'server_url': url, 'username': 'benchmark', 'password': 'benchmark', 'verify_ssl': False,
+                  'config_id': 'benchmark'}
+        selected = set(args.operations.split(',')) if args.operations else None
+        plan = [s for s in scenarios(Inventory(**inventory_options))
+                if selected is None or s[0] in selected or s[1] in selected]
+        uncovered = set(modules['operations'].operations) - NO_SCENARIO - {
+            operation for _, operation, _ in scenarios(Inventory())}
+        if uncovered:
+            print('No benchmark scenario for: {0}'.format(', '.join(sorted(uncovered))), file=sys.stderr)
+        results = {}
+        for label, operation, params in plan:
+            results[label] = run_scenario(modules, config, operation, params, args.iterations, args.warm,
+                                          args.revalidate, args.threads)
+        print_report(results)
+        if args.json_path:
+            with open(args.json_path, 'w') as handle:
+                json.dump({'options': vars(args), 'results': results}, handle, indent=2)
+    finally:
+        server.terminate()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import asyncio
+import os
+import sys
+import importlib
+import threading
+import time
+
+import pytest
+
+current_directory = os.path.dirname(__file__)
+parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
+grandparent_directory = os.path.abspath(os.path.join(parent_directory, os.pardir))
+sys.path.insert(0, str(grandparent_directory))
+
+transport = importlib.import_module('otbase-inventory_1_1_0.transport')
+async_transport = importlib.import_module('otbase-inventory_1_1_0.async_transport')
+
+
+def test_governor_cap_is_shared_by_threads_and_coroutines():
+    governor = transport.ServerGovernor(max_concurrent=2)
+    peak = [0]
+    lock = threading.Lock()
+
+    def note():
+        with lock:
+            peak[0] = max(peak[0], governor._in_flight)
+
+    def thread_requests():
+        for _ in range(20):
+            with governor.acquire():
+                note()
+                time.sleep(0.001)
+
+    async def request():
+        async with governor.acquire_async():
+            note()
+            await asyncio.sleep(0.001)
+
+    async def main():
+        tasks = [asyncio.ensure_future(request()) for _ in range(100)]
+        await asyncio.sleep(0.005)
+        # Cancelled waiters must not keep the slots they were woken for
+        for task in tasks[::4]:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return sum(1 for task in tasks if task.cancelled())
+
+    threads = [threading.Thread(target=thread_requests) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    cancelled = asyncio.run(main())
+    for thread in threads:
+        thread.join()
+    assert peak[0] <= 2
+    assert governor._in_flight == 0 and not governor._waiters
+    assert governor.stats()['requests'] == 40 + 100 - cancelled
+
+
+def test_query_params_repeat_lists_and_stringify_booleans():
+    assert async_transport.query_params({'include': ['all', 'software'], 'count': 5, 'flag': True, 'skip': None}) == [
+        ('include', 'all'), ('include', 'software'), ('count', 5), ('flag', 'True')]
+    assert async_transport.query_params({}) is None
+
+
+@pytest.mark.skipif(not async_transport.async_available(), reason='aiohttp is not installed')
+def test_event_loop_runs_coroutines_in_the_caller_context():
+    metrics = importlib.import_module('otbase-inventory_1_1_0.metrics').metrics
+
+    async def current():
+        return metrics.current_operation()
+
+    with metrics.track_operation('get_devices_sharded'):
+        assert async_transport.run_async(current()) == 'get_devices_sharded'
+    assert async_transport.run_async(current()) is None
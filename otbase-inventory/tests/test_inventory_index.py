@@ -0,0 +1,59 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import os
+import sys
+import importlib
+
+current_directory = os.path.dirname(__file__)
+parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
+grandparent_directory = os.path.abspath(os.path.join(parent_directory, os.pardir))
+sys.path.insert(0, str(grandparent_directory))
+
+inventory_index = importlib.import_module('otbase-inventory_1_1_0.inventory_index')
+
+
+def make_device(index, addresses, network_id='net-1'):
+    mac = '00:00:00:00:{0:02x}:{1:02x}'.format(index // 256, index % 256)
+    return {
+        'deviceId': 'dev-{0}'.format(index),
+        'name': 'device {0}'.format(index),
+        'connections': [{'L3Address': address, 'L2Address': mac, 'networkId': network_id} for address in addresses]
+    }
+
+
+def test_lookup_cidr_returns_each_device_once():
+    index = inventory_index.InventoryIndex([
+        make_device(1, ['10.0.0.5', '10.0.0.9']),
+        make_device(2, ['10.0.0.7']),
+        make_device(3, ['192.168.1.1'])
+    ])
+    result = index.lookup_cidr('10.0.0.0/24')
+    assert [device['deviceId'] for device in result] == ['dev-1', 'dev-2']
+    assert index.lookup_cidr('not a subnet') == []
+
+
+def test_exact_lookups_deduplicate_in_insertion_order():
+    devices = [make_device(1, ['10.0.0.1', '10.0.0.1']), make_device(2, ['10.0.0.1'])]
+    index = inventory_index.InventoryIndex(devices)
+    assert [device['deviceId'] for device in index.lookup_ip('10.0.0.1')] == ['dev-1', 'dev-2']
+    assert [device['deviceId'] for device in index.lookup_network('net-1')] == ['dev-1', 'dev-2']
+    assert [device['deviceId'] for device in index.lookup_mac('000000000001')] == ['dev-1']
+
+
+def test_lookup_cidr_large_subnet():
+    # Two addresses per device in one /16; the lookup time is measured by the lookup_devices[subnet]
+    # benchmark scenario
+    count = 5000
+    devices = [make_device(i, ['10.1.{0}.{1}'.format(i // 200, i % 200),
+                               '10.1.{0}.{1}'.format(i // 200, 200 + i % 50)]) for i in range(count)]
+    index = inventory_index.InventoryIndex(devices)
+    result = index.lookup_cidr('10.1.0.0/16')
+    # Each device once, in the order of its lowest address
+    assert [device['deviceId'] for device in result] == ['dev-{0}'.format(i) for i in range(count)]
+    assert len(index.lookup_network('net-1')) == count
+    assert index.lookup_cidr('10.1.0.0/24') == index.lookup_cidr('10.1.0.0/16')[:200]
@@ -0,0 +1,63 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import os
+import sys
+import time
+import importlib
+
+import pytest
+from connectors.core.connector import ConnectorError
+
+current_directory = os.path.dirname(__file__)
+parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
+grandparent_directory = os.path.abspath(os.path.join(parent_directory, os.pardir))
+sys.path.insert(0, str(grandparent_directory))
+
+operations = importlib.import_module('otbase-inventory_1_1_0.operations')
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2024-03-01', '2024-03-01 00:00:00'),
+    ('2024-03-01 12:30', '2024-03-01 12:30:00'),
+    ('2024-03-01T12:30:45', '2024-03-01 12:30:45'),
+    ('2024-03-01T12:30:45.123Z', '2024-03-01 12:30:45'),
+    ('2024-03-01T12:30:45+02:00', '2024-03-01 10:30:45'),
+    ('2024-03-01T00:30:45-0130', '2024-03-01 02:00:45'),
+    (' 2024-03-01T12:30:45Z ', '2024-03-01 12:30:45')
+])
+def test_normalize_datetime_text(value, expected):
+    assert operations.normalize_datetime(value) == expected
+
+
+@pytest.mark.parametrize('value', [1709296245, 1709296245.5, 1709296245000, '1709296245', '1709296245000'])
+def test_normalize_datetime_epoch(value):
+    # Epochs are formatted in UTC, whatever the time zone of the worker
+    assert operations.normalize_datetime(value) == '2024-03-01 12:30:45'
+
+
+def test_epoch_and_iso_agree(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    if hasattr(time, 'tzset'):
+        time.tzset()
+    try:
+        assert operations.normalize_datetime(1709294400) == operations.normalize_datetime('2024-03-01T12:00:00Z')
+    finally:
+        monkeypatch.undo()
+        if hasattr(time, 'tzset'):
+            time.tzset()
+
+
+def test_check_payload_multiselect():
+    payload = operations.check_payload({'include': ['All', ' Software', None, ''], 'priority': [], 'count': '5'})
+    assert payload == {'include': 'all,software', 'count': 5}
+
+
+@pytest.mark.parametrize('value', ['yesterday', '2024-13', True, '-1709296245'])
+def test_normalize_datetime_invalid(value):
+    with pytest.raises(ConnectorError):
+        operations.normalize_datetime(value)
@@ -154,6 +154,102 @@ def test_validate_get_devices_list_output_schema(valid_configuration_with_token)
         pytest.skip("Skipping test because output_schema is not a dict.")
 
 
+@pytest.mark.get_devices_delta
+@pytest.mark.parametrize("input_params", params['get_devices_delta'])
+def test_get_devices_delta_success(valid_configuration_with_token, input_params):
+    logger.info("params: {0}".format(input_params))
+    result = connector_instance.execute(valid_configuration_with_token.copy(), 'get_devices_delta',
+                                        input_params.copy())
+    logger.info(result)
+    assert result
+
+
+# Ensure that the provided input_params yield the correct output schema, or adjust the index in the list below.
+# Add logic for validating conditional_output_schema or if schema is other than dict.
+@pytest.mark.get_devices_delta
+@pytest.mark.schema_validation
+def test_validate_get_devices_delta_output_schema(valid_configuration_with_token):
+    input_params = params.get('get_devices_delta')[0].copy()
+    schema = {}
+    for operation in info_json.get("operations"):
+        if operation.get('operation') == 'get_devices_delta':
+            if "conditional_output_schema" in operation or "api_output_schema" in operation:
+                pytest.skip("Skipping test because conditional_output_schema or api_output_schema is not supported.")
+            else:
+                schema = operation.get('output_schema')
+            break
+    resp = connector_instance.execute(valid_configuration_with_token.copy(), 'get_devices_delta', input_params)
+    if isinstance(schema, dict) and isinstance(resp, dict):
+        logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
+        assert resp.keys() == schema.keys()
+    else:
+        pytest.skip("Skipping test because output_schema is not a dict.")
+
+
+@pytest.mark.fetch_devices_as_assets
+@pytest.mark.parametrize("input_params", params['fetch_devices_as_assets'])
+def test_fetch_devices_as_assets_success(valid_configuration_with_token, input_params):
+    logger.info("params: {0}".format(input_params))
+    result = connector_instance.execute(valid_configuration_with_token.copy(), 'fetch_devices_as_assets',
+                                        input_params.copy())
+    logger.info(result)
+    assert result
+
+
+# Ensure that the provided input_params yield the correct output schema, or adjust the index in the list below.
+# Add logic for validating conditional_output_schema or if schema is other than dict.
+@pytest.mark.fetch_devices_as_assets
+@pytest.mark.schema_validation
+def test_validate_fetch_devices_as_assets_output_schema(valid_configuration_with_token):
+    input_params = params.get('fetch_devices_as_assets')[0].copy()
+    schema = {}
+    for operation in info_json.get("operations"):
+        if operation.get('operation') == 'fetch_devices_as_assets':
+            if "conditional_output_schema" in operation or "api_output_schema" in operation:
+                pytest.skip("Skipping test because conditional_output_schema or api_output_schema is not supported.")
+            else:
+                schema = operation.get('output_schema')
+            break
+    resp = connector_instance.execute(valid_configuration_with_token.copy(), 'fetch_devices_as_assets', input_params)
+    if isinstance(schema, dict) and isinstance(resp, dict):
+        logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
+        assert resp.keys() == schema.keys()
+    else:
+        pytest.skip("Skipping test because output_schema is not a dict.")
+
+
+@pytest.mark.get_devices_sharded
+@pytest.mark.parametrize("input_params", params['get_devices_sharded'])
+def test_get_devices_sharded_success(valid_configuration_with_token, input_params):
+    logger.info("params: {0}".format(input_params))
+    result = connector_instance.execute(valid_configuration_with_token.copy(), 'get_devices_sharded',
+                                        input_params.copy())
+    logger.info(result)
+    assert result
+
+
+# Ensure that the provided input_params yield the correct output schema, or adjust the index in the list below.
+# Add logic for validating conditional_output_schema or if schema is other than dict.
+@pytest.mark.get_devices_sharded
+@pytest.mark.schema_validation
+def test_validate_get_devices_sharded_output_schema(valid_configuration_with_token):
+    input_params = params.get('get_devices_sharded')[0].copy()
+    schema = {}
+    for operation in info_json.get("operations"):
+        if operation.get('operation') == 'get_devices_sharded':
+            if "conditional_output_schema" in operation or "api_output_schema" in operation:
+                pytest.skip("Skipping test because conditional_output_schema or api_output_schema is not supported.")
+            else:
+                schema = operation.get('output_schema')
+            break
+    resp = connector_instance.execute(valid_configuration_with_token.copy(), 'get_devices_sharded', input_params)
+    if isinstance(schema, dict) and isinstance(resp, dict):
+        logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
+        assert resp.keys() == schema.keys()
+    else:
+        pytest.skip("Skipping test because output_schema is not a dict.")
+
+
 @pytest.mark.get_device_details
 @pytest.mark.parametrize("input_params", params['get_device_details'])
 def test_get_device_details_success(valid_configuration_with_token, input_params):
@@ -186,6 +282,38 @@ def test_validate_get_device_details_output_schema(valid_configuration_with_toke
         pytest.skip("Skipping test because output_schema is not a dict.")
 
 
+@pytest.mark.get_devices_details_bulk
+@pytest.mark.parametrize("input_params", params['get_devices_details_bulk'])
+def test_get_devices_details_bulk_success(valid_configuration_with_token, input_params):
+    logger.info("params: {0}".format(input_params))
+    result = connector_instance.execute(valid_configuration_with_token.copy(), 'get_devices_details_bulk',
+                                        input_params.copy())
+    logger.info(result)
+    assert result
+
+
+# Ensure that the provided input_params yield the correct output schema, or adjust the index in the list below.
+# Add logic for validating conditional_output_schema or if schema is other than dict.
+@pytest.mark.get_devices_details_bulk
+@pytest.mark.schema_validation
+def test_validate_get_devices_details_bulk_output_schema(valid_configuration_with_token):
+    input_params = params.get('get_devices_details_bulk')[0].copy()
+    schema = {}
+    for operation in info_json.get("operations"):
+        if operation.get('operation') == 'get_devices_details_bulk':
+            if "conditional_output_schema" in operation or "api_output_schema" in operation:
+                pytest.skip("Skipping test because conditional_output_schema or api_output_schema is not supported.")
+            else:
+                schema = operation.get('output_schema')
+            break
+    resp = connector_instance.execute(valid_configuration_with_token.copy(), 'get_devices_details_bulk', input_params)
+    if isinstance(schema, dict) and isinstance(resp, dict):
+        logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
+        assert resp.keys() == schema.keys()
+    else:
+        pytest.skip("Skipping test because output_schema is not a dict.")
+
+
 @pytest.mark.get_vulnerabilities_list
 @pytest.mark.parametrize("input_params", params['get_vulnerabilities_list'])
 def test_get_vulnerabilities_list_success(valid_configuration_with_token, input_params):
@@ -250,6 +378,38 @@ def test_validate_get_vulnerability_details_output_schema(valid_configuration_wi
         pytest.skip("Skipping test because output_schema is not a dict.")
 
 
+@pytest.mark.get_devices_vulnerabilities
+@pytest.mark.parametrize("input_params", params['get_devices_vulnerabilities'])
+def test_get_devices_vulnerabilities_success(valid_configuration_with_token, input_params):
+    logger.info("params: {0}".format(input_params))
+    result = connector_instance.execute(valid_configuration_with_token.copy(), 'get_devices_vulnerabilities',
+                                        input_params.copy())
+    logger.info(result)
+    assert result
+
+
+# Ensure that the provided input_params yield the correct output schema, or adjust the index in the list below.
+# Add logic for validating conditional_output_schema or if schema is other than dict.
+@pytest.mark.get_devices_vulnerabilities
+@pytest.mark.schema_validation
+def test_validate_get_devices_vulnerabilities_output_schema(valid_configuration_with_token):
+    input_params = params.get('get_devices_vulnerabilities')[0].copy()
+    schema = {}
+    for operation in info_json.get("operations"):
+        if operation.get('operation') == 'get_devices_vulnerabilities':
+            if "conditional_output_schema" in operation or "api_output_schema" in operation:
+                pytest.skip("Skipping test because conditional_output_schema or api_output_schema is not supported.")
+            else:
+                schema = operation.get('output_schema')
+            break
+    resp = connector_instance.execute(valid_configuration_with_token.copy(), 'get_devices_vulnerabilities', input_params)
+    if isinstance(schema, dict) and isinstance(resp, dict):
+        logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
+        assert resp.keys() == schema.keys()
+    else:
+        pytest.skip("Skipping test because output_schema is not a dict.")
+
+
 @pytest.mark.get_data_flow
 @pytest.mark.parametrize("input_params", params['get_data_flow'])
 def test_get_data_flow_success(valid_configuration_with_token, input_params):
@@ -337,6 +497,102 @@ def test_validate_get_network_details_output_schema(valid_configuration_with_tok
                 schema = operation.get('output_schema')
             break
     resp = connector_instance.execute(valid_configuration_with_token.copy(), 'get_network_details', input_params)
+    if isinstance(schema, dict) and isinstance(resp, dict):
+        logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
+        assert resp.keys() == schema.keys()
+    else:
+        pytest.skip("Skipping test because output_schema is not a dict.")
+
+
+@pytest.mark.lookup_devices
+@pytest.mark.parametrize("input_params", params['lookup_devices'])
+def test_lookup_devices_success(valid_configuration_with_token, input_params):
+    logger.info("params: {0}".format(input_params))
+    result = connector_instance.execute(valid_configuration_with_token.copy(), 'lookup_devices',
+                                        input_params.copy())
+    logger.info(result)
+    assert result
+
+
+# Ensure that the provided input_params yield the correct output schema, or adjust the index in the list below.
+# Add logic for validating conditional_output_schema or if schema is other than dict.
+@pytest.mark.lookup_devices
+@pytest.mark.schema_validation
+def test_validate_lookup_devices_output_schema(valid_configuration_with_token):
+    input_params = params.get('lookup_devices')[0].copy()
+    schema = {}
+    for operation in info_json.get("operations"):
+        if operation.get('operation') == 'lookup_devices':
+            if "conditional_output_schema" in operation or "api_output_schema" in operation:
+                pytest.skip("Skipping test because conditional_output_schema or api_output_schema is not supported.")
+            else:
+                schema = operation.get('output_schema')
+            break
+    resp = connector_instance.execute(valid_configuration_with_token.copy(), 'lookup_devices', input_params)
+    if isinstance(schema, dict) and isinstance(resp, dict):
+        logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
+        assert resp.keys() == schema.keys()
+    else:
+        pytest.skip("Skipping test because output_schema is not a dict.")
+
+
+@pytest.mark.get_connector_metrics
+@pytest.mark.parametrize("input_params", params['get_connector_metrics'])
+def test_get_connector_metrics_success(valid_configuration_with_token, input_params):
+    logger.info("params: {0}".format(input_params))
+    result = connector_instance.execute(valid_configuration_with_token.copy(), 'get_connector_metrics',
+                                        input_params.copy())
+    logger.info(result)
+    assert result
+
+
+# Ensure that the provided input_params yield the correct output schema, or adjust the index in the list below.
+# Add logic for validating conditional_output_schema or if schema is other than dict.
+@pytest.mark.get_connector_metrics
+@pytest.mark.schema_validation
+def test_validate_get_connector_metrics_output_schema(valid_configuration_with_token):
+    input_params = params.get('get_connector_metrics')[0].copy()
+    schema = {}
+    for operation in info_json.get("operations"):
+        if operation.get('operation') == 'get_connector_metrics':
+            if "conditional_output_schema" in operation or "api_output_schema" in operation:
+                pytest.skip("Skipping test because conditional_output_schema or api_output_schema is not supported.")
+            else:
+                schema = operation.get('output_schema')
+            break
+    resp = connector_instance.execute(valid_configuration_with_token.copy(), 'get_connector_metrics', input_params)
+    if isinstance(schema, dict) and isinstance(resp, dict):
+        logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
+        assert resp.keys() == schema.keys()
+    else:
+        pytest.skip("Skipping test because output_schema is not a dict.")
+
+
+@pytest.mark.get_debug_trace
+@pytest.mark.parametrize("input_params", params['get_debug_trace'])
+def test_get_debug_trace_success(valid_configuration_with_token, input_params):
+    logger.info("params: {0}".format(input_params))
+    result = connector_instance.execute(valid_configuration_with_token.copy(), 'get_debug_trace',
+                                        input_params.copy())
+    logger.info(result)
+    assert result
+
+
+# Ensure that the provided input_params yield the correct output schema, or adjust the index in the list below.
+# Add logic for validating conditional_output_schema or if schema is other than dict.
+@pytest.mark.get_debug_trace
+@pytest.mark.schema_validation
+def test_validate_get_debug_trace_output_schema(valid_configuration_with_token):
+    input_params = params.get('get_debug_trace')[0].copy()
+    schema = {}
+    for operation in info_json.get("operations"):
+        if operation.get('operation') == 'get_debug_trace':
+            if "conditional_output_schema" in operation or "api_output_schema" in operation:
+                pytest.skip("Skipping test because conditional_output_schema or api_output_schema is not supported.")
+            else:
+                schema = operation.get('output_schema')
+            break
+    resp = connector_instance.execute(valid_configuration_with_token.copy(), 'get_debug_trace', input_params)
     if isinstance(schema, dict) and isinstance(resp, dict):
         logger.info("output_schema: {0} \n API_response: {1}".format(schema, resp))
         assert resp.keys() == schema.keys()
@@ -0,0 +1,50 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import os
+import sys
+import importlib
+
+current_directory = os.path.dirname(__file__)
+parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
+grandparent_directory = os.path.abspath(os.path.join(parent_directory, os.pardir))
+sys.path.insert(0, str(grandparent_directory))
+
+projection = importlib.import_module('otbase-inventory_1_1_0.projection')
+
+DEVICE = {
+    'deviceId': 'D1',
+    'name': 'PLC-1',
+    'hardware': {'vendor': 'Siemens', 'model': 'S7-1500', 'serial': 'X1'},
+    'connections': [{'L3Address': '10.0.0.1', 'L2Address': 'aa'}, {'L3Address': '10.0.0.2', 'L2Address': 'bb'}],
+    'software': [{'name': 'firmware', 'version': '2.9'}]
+}
+
+
+def test_parse_fields():
+    assert projection.parse_fields(None) == {}
+    assert projection.parse_fields('deviceId, hardware.vendor,,hardware.model') == \
+        {'deviceId': {}, 'hardware': {'vendor': {}, 'model': {}}}
+    # A shorter path keeps the whole value, whatever order the paths come in
+    assert projection.parse_fields(['hardware', 'hardware.vendor']) == {'hardware': {}}
+    assert projection.parse_fields(['hardware.vendor', 'hardware']) == {'hardware': {}}
+
+
+def test_project():
+    tree = projection.parse_fields('deviceId,hardware.vendor,connections.L3Address,missing.member')
+    assert projection.project(DEVICE, tree) == {
+        'deviceId': 'D1',
+        'hardware': {'vendor': 'Siemens'},
+        'connections': [{'L3Address': '10.0.0.1'}, {'L3Address': '10.0.0.2'}]
+    }
+    assert projection.project(DEVICE, {}) is DEVICE
+    assert projection.project([DEVICE], {'name': {}}) == [{'name': 'PLC-1'}]
+    assert projection.project('scalar', {'name': {}}) == 'scalar'
+
+
+def test_include_for_fields():
+    assert projection.include_for_fields(projection.parse_fields('deviceId,software.name')) == ['software']
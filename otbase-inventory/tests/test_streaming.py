@@ -0,0 +1,68 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import os
+import sys
+import importlib
+import json
+import random
+
+current_directory = os.path.dirname(__file__)
+parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
+grandparent_directory = os.path.abspath(os.path.join(parent_directory, os.pardir))
+sys.path.insert(0, str(grandparent_directory))
+
+streaming = importlib.import_module('otbase-inventory_1_1_0.streaming')
+
+DOCUMENT = {
+    'info': {'total': 4, 'offset': 0},
+    'data': [
+        {'deviceId': 'D1', 'name': 'PLC \u00e9\u20ac', 'score': 9.8, 'exponent': -1.5e-7, 'big': 12345678901234},
+        {'deviceId': 'D2', 'active': True, 'parent': None, 'tags': ['a', 'b'], 'nested': {'values': [1, 2.5, -3]}},
+        42,
+        0.001
+    ],
+    'next': 'end'
+}
+
+
+def stream(chunks):
+    parser = streaming.JSONArrayStream(chunks)
+    return list(parser), parser.fields
+
+
+def split(body, rng):
+    cuts = sorted(rng.sample(range(1, len(body)), rng.randint(1, min(20, len(body) - 1))))
+    return [body[start:end] for start, end in zip([0] + cuts, cuts + [len(body)])]
+
+
+def test_split_number():
+    assert stream([b'{"data":[9.', b'8]}'])[0] == [9.8]
+    assert stream([b'{"data":[1', b'2e', b'1, -', b'0.5]}'])[0] == [120.0, -0.5]
+
+
+def test_chunk_boundaries_fuzz():
+    rng = random.Random(1)
+    for indent in (None, 2):
+        body = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False).encode('utf-8')
+        for _ in range(300):
+            items, fields = stream(split(body, rng))
+            assert items == DOCUMENT['data']
+            assert fields == {'info': DOCUMENT['info'], 'next': 'end'}
+        # Every boundary, one byte at a time, including inside multi-byte characters
+        assert stream([body[i:i + 1] for i in range(len(body))])[0] == DOCUMENT['data']
+
+
+def test_empty_and_malformed():
+    assert stream([b'{}']) == ([], {})
+    assert stream([b'{"data": []}']) == ([], {})
+    try:
+        stream([b'{"data": [1 2]}'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('malformed body was accepted')
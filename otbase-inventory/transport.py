@@ -0,0 +1,500 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests_pkcs12 import Pkcs12Adapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from connectors.core.connector import get_logger
+
+logger = get_logger("otbase-inventory")
+
+# Upper bound on the number of distinct configurations kept alive in a worker
+SESSION_POOL_MAX_SIZE = 8
+# Sessions that have not been used for this many seconds are closed
+SESSION_IDLE_TIMEOUT = 300
+# Number of keep-alive connections each session keeps open to the server
+CONNECTION_POOL_MAXSIZE = 10
+# Upper bound on the number of parsed PKCS#12 client certificates kept in a worker
+PKCS12_CACHE_MAX_SIZE = 4
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 1
+RETRY_BACKOFF_MAX = 30
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Requests per second allowed per server, 0 meaning unlimited
+DEFAULT_RATE_LIMIT = 0
+DEFAULT_MAX_CONCURRENT_REQUESTS = 10
+
+
+def _digest(value):
+    if value is None:
+        return None
+    return hashlib.sha256(str(value).encode('utf-8')).hexdigest()
+
+
+def _pfx_mtime(pfx_path):
+    if not pfx_path:
+        return None
+    try:
+        return os.stat(pfx_path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def session_key(config):
+    """Build the pool key of a configuration; secrets are stored only as digests."""
+    pfx_path = config.get('pfx_path') or None
+    return (
+        (config.get('server_url') or '').strip().strip('/'),
+        config.get('username'),
+        _digest(config.get('password')),
+        pfx_path,
+        _pfx_mtime(pfx_path),
+        _digest(config.get('pfx_password')),
+        bool(config.get('verify_ssl'))
+    )
+
+
+_connect_timing = threading.local()
+
+
+def take_connect_time():
+    """Seconds the calling thread spent establishing connections since the previous call."""
+    elapsed = getattr(_connect_timing, 'elapsed', 0.0)
+    _connect_timing.elapsed = 0.0
+    return elapsed
+
+
+class _TimedConnectMixin(object):
+
+    def connect(self):
+        started = time.monotonic()
+        try:
+            return super(_TimedConnectMixin, self).connect()
+        finally:
+            _connect_timing.elapsed = getattr(_connect_timing, 'elapsed', 0.0) + time.monotonic() - started
+
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report their connect (TCP and TLS handshake) time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                   'https': TimedHTTPSConnectionPool}
+
+
+class SSLContextAdapter(TimedHTTPAdapter):
+    """HTTPAdapter that presents an already built client certificate SSL context."""
+
+    def __init__(self, ssl_context, *args, **kwargs):
+        self.ssl_context = ssl_context
+        super(SSLContextAdapter, self).__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super(SSLContextAdapter, self).init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super(SSLContextAdapter, self).proxy_manager_for(*args, **kwargs)
+
+
+class Pkcs12ContextCache(object):
+    """Client certificate SSL contexts parsed from PFX files, reloaded when the file changes.
+
+    Contexts are keyed on the PFX path, its modification time, a digest of its password and
+    the SSL verification flag (hostname checking has to be disabled on the context itself
+    when verification is off, so both variants cannot share one context).
+    """
+
+    def __init__(self, max_size=PKCS12_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._contexts = OrderedDict()
+
+    def get(self, pfx_path, pfx_password, verify_ssl):
+        key = (pfx_path, _pfx_mtime(pfx_path), _digest(pfx_password), bool(verify_ssl))
+        with self._lock:
+            ssl_context = self._contexts.pop(key, None)
+            if ssl_context is None:
+                logger.debug('Loading client certificate from {0}'.format(pfx_path))
+                ssl_context = Pkcs12Adapter(pkcs12_filename=pfx_path, pkcs12_password=pfx_password).ssl_context
+                if not verify_ssl:
+                    ssl_context.check_hostname = False
+                for stale_key in [k for k in self._contexts if k[0] == pfx_path]:
+                    del self._contexts[stale_key]
+            self._contexts[key] = ssl_context
+            while len(self._contexts) > self.max_size:
+                self._contexts.popitem(last=False)
+            return ssl_context
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+
+
+pkcs12_cache = Pkcs12ContextCache()
+
+
+def _build_session(config):
+    session = requests.Session()
+    session.auth = (config.get('username'), config.get('password'))
+    session.verify = config.get('verify_ssl')
+    pool_maxsize = connection_pool_size(config)
+    adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    if config.get('pfx_path'):
+        ssl_context = pkcs12_cache.get(config.get('pfx_path'), config.get('pfx_password'), config.get('verify_ssl'))
+        adapter = SSLContextAdapter(ssl_context, pool_connections=1, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    return session
+
+
+class SessionPool(object):
+    """Keep-alive ``requests.Session`` objects shared by all OTBase instances of a worker."""
+
+    def __init__(self, max_size=SESSION_POOL_MAX_SIZE, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._config_keys = {}
+
+    def get(self, config):
+        key = session_key(config)
+        config_id = config.get('config_id')
+        with self._lock:
+            self._evict_idle()
+            if config_id is not None:
+                previous_key = self._config_keys.get(config_id)
+                if previous_key is not None and previous_key != key:
+                    logger.debug('Configuration {0} changed, dropping its pooled session'.format(config_id))
+                    self._close(previous_key)
+                self._config_keys[config_id] = key
+            entry = self._sessions.pop(key, None)
+            if entry is None:
+                session = self._build(config)
+            else:
+                session = entry[0]
+            self._sessions[key] = (session, time.monotonic())
+            while len(self._sessions) > self.max_size:
+                oldest_key = next(iter(self._sessions))
+                self._close(oldest_key)
+            return session
+
+    def invalidate(self, config):
+        with self._lock:
+            self._close(session_key(config))
+            config_id = config.get('config_id')
+            if config_id is not None:
+                key = self._config_keys.pop(config_id, None)
+                if key is not None:
+                    self._close(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._sessions):
+                self._close(key)
+            self._config_keys.clear()
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        for key, (session, last_used) in list(self._sessions.items()):
+            if now - last_used > self.idle_timeout:
+                self._close(key)
+
+    def _build(self, config):
+        return _build_session(config)
+
+    def _close(self, key):
+        entry = self._sessions.pop(key, None)
+        if entry is not None:
+            try:
+                self._close_session(entry[0])
+            except Exception as err:
+                logger.debug('Error while closing pooled session: {0}'.format(err))
+
+    def _close_session(self, session):
+        session.close()
+
+
+session_pool = SessionPool()
+
+
+def _int_setting(config, name, default):
+    value = config.get(name)
+    if value is None or value == '':
+        return default
+    return int(value)
+
+
+def connection_pool_size(config):
+    """Connections kept alive per server: one for every request the governor lets through at once."""
+    return max(CONNECTION_POOL_MAXSIZE,
+               _int_setting(config, 'max_concurrent_requests', DEFAULT_MAX_CONCURRENT_REQUESTS))
+
+
+def request_timeout(config):
+    """The (connect, read) timeout tuple of a configuration."""
+    return (_int_setting(config, 'connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+            _int_setting(config, 'read_timeout', DEFAULT_READ_TIMEOUT))
+
+
+class RetryPolicy(object):
+    """Exponential backoff with full jitter, honoring Retry-After on 429 and 503 responses."""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, backoff_base=RETRY_BACKOFF_BASE,
+                 backoff_max=RETRY_BACKOFF_MAX, status_codes=RETRY_STATUS_CODES):
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.status_codes = status_codes
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(max_retries=_int_setting(config, 'max_retries', DEFAULT_MAX_RETRIES))
+
+    def attempts(self, method):
+        # Only idempotent reads are retried
+        return self.max_retries + 1 if method == 'GET' else 1
+
+    def should_retry(self, response):
+        return response.status_code in self.status_codes
+
+    def delay(self, attempt, response=None):
+        if response is not None and response.status_code in (429, 503):
+            retry_after = self._retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    @staticmethod
+    def _retry_after(value):
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class ServerGovernor(object):
+    """Token bucket rate limit and in-flight cap shared by every OTBase instance targeting one server."""
+
+    def __init__(self, rate_limit=DEFAULT_RATE_LIMIT, max_concurrent=DEFAULT_MAX_CONCURRENT_REQUESTS):
+        self._lock = threading.Lock()
+        # Guards the in-flight count; a condition rather than a semaphore, so that the cap can be
+        # changed while requests are in flight
+        self._slots = threading.Condition(threading.Lock())
+        # (loop, future) of the coroutines waiting for a slot, woken one per released slot like the threads
+        self._waiters = deque()
+        self._in_flight = 0
+        self._refilled_at = time.monotonic()
+        self.rate_limit = self.max_concurrent = self.burst = self._tokens = None
+        self.set_limits(rate_limit, max_concurrent)
+        self.requests = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+
+    def set_limits(self, rate_limit, max_concurrent):
+        with self._lock:
+            self.rate_limit = float(rate_limit or 0)
+            self.burst = max(1.0, self.rate_limit)
+            self._tokens = self.burst if self._tokens is None else min(self._tokens, self.burst)
+        with self._slots:
+            self.max_concurrent = max(1, int(max_concurrent))
+            self._slots.notify_all()
+            while self._waiters:
+                self._wake(*self._waiters.popleft())
+
+    def _take_token(self):
+        """Take a token from the bucket, returning how long to sleep before it may be used."""
+        if not self.rate_limit:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_limit)
+            self._refilled_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_limit
+
+    @staticmethod
+    def _wake(loop, waiter):
+        loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+
+    def _release(self):
+        with self._slots:
+            self._in_flight -= 1
+            self._slots.notify()
+            if self._waiters:
+                self._wake(*self._waiters.popleft())
+
+    def _count(self, started):
+        waited = time.monotonic() - started
+        with self._lock:
+            self.requests += 1
+            if waited > 0.001:
+                self.waited += 1
+                self.wait_seconds += waited
+
+    @contextmanager
+    def acquire(self):
+        started = time.monotonic()
+        with self._slots:
+            while self._in_flight >= self.max_concurrent:
+                self._slots.wait()
+            self._in_flight += 1
+        try:
+            delay = self._take_token()
+            if delay:
+                time.sleep(delay)
+            self._count(started)
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def acquire_async(self):
+        """Awaitable :meth:`acquire`, sharing its in-flight count and token bucket with the threads."""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._slots:
+                if self._in_flight < self.max_concurrent:
+                    self._in_flight += 1
+                    break
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._slots:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    elif self._waiters:
+                        # Already woken for a released slot: hand the wake-up over to the next coroutine
+                        self._wake(*self._waiters.popleft())
+                raise
+        try:
+            delay = self._take_token()
+            if delay:
+                await asyncio.sleep(delay)
+            self._count(started)
+            yield
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate_limit': self.rate_limit,
+                'max_concurrent_requests': self.max_concurrent,
+                'requests': self.requests,
+                'waited': self.waited,
+                'wait_seconds': round(self.wait_seconds, 3)
+            }
+
+
+def _strictest(limits):
+    """The lowest rate limit (0 is unlimited) and the lowest in-flight cap of several configurations."""
+    rates = [rate for rate, _ in limits if rate]
+    return min(rates) if rates else 0.0, min(max_concurrent for _, max_concurrent in limits)
+
+
+class GovernorRegistry(object):
+    """One governor per server, enforcing the strictest limits of the configurations that target it.
+
+    The limits of each configuration are remembered, so that the governor is relaxed again when the
+    configuration that set the strictest ones is updated or deleted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._governors = {}
+        self._limits = {}
+
+    @staticmethod
+    def _server(config):
+        return (config.get('server_url') or '').strip().strip('/')
+
+    @staticmethod
+    def _config_key(config):
+        return config.get('config_id') or session_key(config)
+
+    def get(self, config):
+        server = self._server(config)
+        limits = (float(_int_setting(config, 'rate_limit', DEFAULT_RATE_LIMIT)),
+                  max(1, _int_setting(config, 'max_concurrent_requests', DEFAULT_MAX_CONCURRENT_REQUESTS)))
+        with self._lock:
+            server_limits = self._limits.setdefault(server, {})
+            changed = server_limits.get(self._config_key(config)) != limits
+            server_limits[self._config_key(config)] = limits
+            governor = self._governors.get(server)
+            if governor is None:
+                governor = self._governors[server] = ServerGovernor(*_strictest(server_limits.values()))
+            elif changed:
+                governor.set_limits(*_strictest(server_limits.values()))
+            return governor
+
+    def forget(self, config):
+        """Drop the limits of a configuration that was updated or deleted."""
+        server = self._server(config)
+        with self._lock:
+            server_limits = self._limits.get(server)
+            if not server_limits or server_limits.pop(self._config_key(config), None) is None:
+                return
+            governor = self._governors.get(server)
+            if server_limits and governor is not None:
+                governor.set_limits(*_strictest(server_limits.values()))
+
+    def stats(self):
+        with self._lock:
+            return {server: governor.stats() for server, governor in self._governors.items()}
+
+
+governors = GovernorRegistry()
@@ -0,0 +1,110 @@
+"""
+Copyright start
+MIT License
+Copyright (c) 2024 Fortinet Inc
+Copyright end
+"""
+
+from .device_model import Interner
+from .inventory_index import device_summary
+
+# Rank of the OTbase vulnerability priorities, highest first
+PRIORITY_RANK = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+_UNRANKED = len(PRIORITY_RANK)
+
+
+def priority_rank(priority):
+    return PRIORITY_RANK.get(str(priority or '').lower(), _UNRANKED)
+
+
+def _score(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _device_id(reference):
+    return reference.get('deviceId') if isinstance(reference, dict) else reference
+
+
+def vulnerability_summary(vulnerability):
+    return {
+        'cveId': vulnerability.get('cveId'),
+        'priority': vulnerability.get('priority'),
+        'severity': vulnerability.get('severity'),
+        'baseScore': vulnerability.get('baseScore'),
+        'kev': vulnerability.get('kev')
+    }
+
+
+class VulnerabilityJoin(object):
+    """Join a vulnerabilities listing with a devices listing using two in-memory indexes.
+
+    ``cve_devices`` maps a CVE ID to the IDs of its affected devices, held in an insertion-ordered
+    dict so that duplicates are dropped in constant time, and ``device_cves`` maps a device ID to
+    its CVE IDs, so each listing is scanned only once.
+    """
+
+    def __init__(self, priorities=None):
+        self.priorities = {str(p).lower() for p in priorities or []}
+        self.vulnerabilities = {}
+        self.cve_devices = {}
+        self.device_cves = {}
+        self.devices = {}
+        self._intern = Interner()
+
+    def add_vulnerability(self, vulnerability):
+        if self.priorities and str(vulnerability.get('priority') or '').lower() not in self.priorities:
+            return
+        cve_id = vulnerability.get('cveId')
+        self.vulnerabilities[cve_id] = vulnerability_summary(vulnerability)
+        device_ids = self.cve_devices.setdefault(cve_id, {})
+        for reference in vulnerability.get('devices') or []:
+            device_id = _device_id(reference)
+            if device_id is None or device_id in device_ids:
+                continue
+            device_ids[device_id] = None
+            self.device_cves.setdefault(device_id, []).append(cve_id)
+
+    def add_device(self, device):
+        # Only devices affected by a selected vulnerability are kept
+        if device.get('deviceId') in self.device_cves:
+            self.devices[device.get('deviceId')] = device_summary(device, self._intern)
+
+    def _sort_key(self, cve_id):
+        vulnerability = self.vulnerabilities[cve_id]
+        return priority_rank(vulnerability['priority']), -_score(vulnerability['baseScore']), str(cve_id)
+
+    def result(self):
+        """Device rows with their vulnerabilities and vulnerability rows with their devices, highest priority first.
+
+        Devices missing from the devices listing (for example, outside of the requested location)
+        are left out of both views.
+        """
+        rows = []
+        for device_id, device in self.devices.items():
+            cve_ids = sorted(self.device_cves[device_id], key=self._sort_key)
+            vulnerabilities = [self.vulnerabilities[cve_id] for cve_id in cve_ids]
+            rows.append(dict(device, **{
+                'vulnerabilities': vulnerabilities,
+                'vulnerability_count': len(vulnerabilities),
+                'highest_priority': vulnerabilities[0]['priority']
+            }))
+        rows.sort(key=lambda row: (priority_rank(row['highest_priority']),
+                                   -max(_score(v['baseScore']) for v in row['vulnerabilities']),
+                                   -row['vulnerability_count'], str(row['deviceId'])))
+        vulnerabilities = []
+        for cve_id in sorted(self.vulnerabilities, key=self._sort_key):
+            device_ids = [device_id for device_id in self.cve_devices[cve_id] if device_id in self.devices]
+            if device_ids:
+                vulnerabilities.append(dict(self.vulnerabilities[cve_id], devices=device_ids))
+        return {
+            'data': rows,
+            'vulnerabilities': vulnerabilities,
+            'info': {
+                'devices': len(rows),
+                'vulnerabilities': len(vulnerabilities),
+                'scanned_vulnerabilities': len(self.cve_devices)
+            }
+        }